@@ -5,7 +5,7 @@ FastAPI application with comprehensive backend features
 import json
 import time
 from contextlib import asynccontextmanager
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 import structlog
 from fastapi import (
     Depends,
@@ -24,13 +24,22 @@ from fastapi.exception_handlers import (
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from starlette.middleware.base import BaseHTTPMiddleware
+from .audit_buffer import audit_log_buffer
 from .auth import AuditLogger, rate_limit
 from .config import Settings, get_settings
-from .database import close_redis, get_db, get_redis, health_check, init_db
+from .database import (
+    close_redis,
+    get_db,
+    get_redis,
+    health_check,
+    SessionLocal,
+    init_db,
+    request_id_var,
+)
 from .endpoints import (
     auth,
     datasets,
@@ -42,7 +51,10 @@ from .endpoints import (
     users,
     websocket,
 )
+from .middleware.logging import disable_queued_logging, enable_queued_logging
 from .models import User
+from .services.model_service import ModelService
+from .services.prediction_service import inference_batcher
 from .schemas import HealthCheck
 
 structlog.configure(
@@ -104,6 +116,7 @@ class AuditMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
         request_id = f"req_{int(time.time() * 1000000.0)}"
         request.state.request_id = request_id
+        request_id_var.set(request_id)
         response = await call_next(request)
         if settings.logging.enable_audit_logging and request.method in [
             "POST",
@@ -178,6 +191,7 @@ websocket_manager = WebSocketManager()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    enable_queued_logging()
     logger.info("Starting Quantis API...")
     try:
         init_db()
@@ -187,21 +201,36 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error("Startup failed", error=str(e))
         raise
+    db = SessionLocal()
+    try:
+        loaded = ModelService(db).preload_trained_models()
+        logger.info("Model artifacts preloaded", count=loaded)
+    except Exception as e:
+        logger.warning("Model preload failed", error=str(e))
+    finally:
+        db.close()
+    monitoring.health_sampler.start()
+    audit_log_buffer.start()
+    inference_batcher.start()
     yield
     logger.info("Shutting down Quantis API...")
+    inference_batcher.stop()
+    monitoring.health_sampler.stop()
+    audit_log_buffer.stop()
     try:
         await close_redis()
         logger.info("Redis connection closed")
     except Exception as e:
         logger.error("Shutdown error", error=str(e))
     logger.info("Quantis API shutdown complete")
+    disable_queued_logging()
 
 
 app = FastAPI(
     title="Quantis API",
     version="2.0.0",
     lifespan=lifespan,
-    default_response_class=JSONResponse,
+    default_response_class=ORJSONResponse,
     openapi_url="/openapi.json" if settings.debug else None,
     docs_url="/docs" if settings.debug else None,
     redoc_url="/redoc" if settings.debug else None,
@@ -0,0 +1,92 @@
+"""
+Buffered audit log writes for Quantis API
+"""
+
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from .database import SessionLocal
+from .models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+
+class _AuditLogBuffer:
+    """Collects audit log rows and writes them in bulk from a daemon thread.
+
+    Each flush is one ``bulk_insert_mappings`` and one commit, so high-volume
+    callers cost a list append instead of a transaction per entry. The flusher
+    runs every ``interval`` seconds, or as soon as ``batch_size`` rows are
+    pending. Once ``max_pending`` rows pile up the caller flushes inline, which
+    bounds memory and pushes back on producers when the database falls behind.
+    Rows take the server-side timestamp of the flush, up to ``interval`` after
+    the call.
+    """
+
+    def __init__(
+        self, interval: float = 0.5, batch_size: int = 100, max_pending: int = 10_000
+    ) -> None:
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._rows: List[Dict[str, Any]] = []
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def add(self, row: Dict[str, Any]) -> None:
+        with self._lock:
+            self._rows.append(row)
+            pending = len(self._rows)
+        if pending >= self.max_pending:
+            self.flush()
+        elif pending >= self.batch_size:
+            self._wake.set()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="audit-log-flusher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval * 2)
+            self._thread = None
+        self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if not rows:
+            return
+        db = SessionLocal()
+        try:
+            db.bulk_insert_mappings(AuditLog, rows)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to write {len(rows)} buffered audit logs: {e}")
+        finally:
+            db.close()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+
+# Started and stopped (with a final flush) by the application lifespan.
+audit_log_buffer = _AuditLogBuffer()
@@ -2,7 +2,7 @@
 Configuration management for the Quantis API - Working version
 """
 
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic_settings import BaseSettings
 from pydantic import Field
 
@@ -23,10 +23,10 @@ class SecurityConfig:
 class DatabaseConfig:
     """Database configuration"""
 
-    pool_size: int = 5
-    max_overflow: int = 10
-    pool_timeout: int = 30
-    pool_recycle: int = 3600
+    pool_size: int = 20
+    max_overflow: int = 40
+    pool_timeout: int = 10
+    pool_recycle: int = 1800
 
     @staticmethod
     def get_database_url(db_type: str = "sqlite") -> str:
@@ -49,6 +49,19 @@ class ComplianceConfig:
     enable_consent_management: bool = False
 
 
+class CeleryConfig:
+    """Celery configuration"""
+
+    broker_url: Optional[str] = None
+    result_backend: Optional[str] = None
+    task_serializer: str = "json"
+    result_serializer: str = "json"
+    accept_content: List[str] = ["json"]
+    timezone: str = "UTC"
+    enable_utc: bool = True
+    task_routes: Dict[str, Dict[str, str]] = {}
+
+
 class EncryptionConfig:
     """Encryption configuration"""
 
@@ -121,7 +134,12 @@ def get_settings() -> Settings:
         sec.algorithm = _settings.algorithm
         sec.access_token_expire_minutes = _settings.access_token_expire_minutes
 
+        celery = CeleryConfig()
+        celery.broker_url = _settings.celery_broker_url
+        celery.result_backend = _settings.celery_broker_url
+
         object.__setattr__(_settings, "security", sec)
+        object.__setattr__(_settings, "celery", celery)
         object.__setattr__(_settings, "database", DatabaseConfig())
         object.__setattr__(_settings, "logging", LoggingConfig())
         object.__setattr__(_settings, "compliance", ComplianceConfig())
@@ -129,6 +147,7 @@ def get_settings() -> Settings:
 
         # For type checking, these need to exist
         _settings.security  # type: ignore
+        _settings.celery  # type: ignore
         _settings.database  # type: ignore
         _settings.logging  # type: ignore
         _settings.compliance  # type: ignore
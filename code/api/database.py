@@ -4,20 +4,30 @@ Database configuration and management for Quantis API
 
 import logging
 import hashlib
+import os
+import time
+from contextvars import ContextVar
 from datetime import datetime, timedelta
 from fastapi import Depends
 from contextlib import asynccontextmanager
 from typing import Any, AsyncGenerator, Dict, List, Optional
 import redis.asyncio as redis
 from cryptography.fernet import Fernet
+from prometheus_client import Histogram
 from redis.asyncio import Redis
-from sqlalchemy import create_engine, event
+from sqlalchemy import create_engine, event, func, tuple_
 from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.pool import QueuePool
 from .config import get_settings
 from .models import ConsentRecord
-from .models import Base, DataMaskingConfig, DataRetentionPolicy, EncryptionKey
+from .models import (
+    AuditLog,
+    Base,
+    DataMaskingConfig,
+    DataRetentionPolicy,
+    EncryptionKey,
+)
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -35,6 +45,17 @@ engine = create_engine(
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 redis_client: Optional[Redis] = None
 _encryption_keys: Dict[str, Fernet] = {}
+# Tracks overflow transitions so they are logged once, not per checkout.
+_pool_overflowing = False
+# Statements slower than this are logged at WARNING with the request id.
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "100"))
+# Set per request by the API middleware so slow query logs can be correlated.
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+SQL_QUERY_DURATION = Histogram(
+    "quantis_sql_query_duration_seconds",
+    "SQL statement execution time in seconds",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5),
+)
 
 
 @event.listens_for(Engine, "connect")
@@ -54,13 +75,57 @@ def receive_checkout(
     dbapi_connection: Any, connection_record: Any, connection_proxy: Any
 ) -> Any:
     """Log database connection checkout"""
+    global _pool_overflowing
     logger.debug("Database connection checked out")
+    if not _pool_overflowing and engine.pool.overflow() > 0:
+        _pool_overflowing = True
+        logger.info(
+            f"Connection pool overflowing: {engine.pool.checkedout()} checked out, "
+            f"pool_size={settings.database.pool_size}"
+        )
 
 
 @event.listens_for(Engine, "checkin")
 def receive_checkin(dbapi_connection: Any, connection_record: Any) -> Any:
     """Log database connection checkin"""
+    global _pool_overflowing
     logger.debug("Database connection checked in")
+    if _pool_overflowing and engine.pool.overflow() <= 0:
+        _pool_overflowing = False
+        logger.info("Connection pool back within pool_size")
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def before_cursor_execute(
+    conn: Any,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: Any,
+    executemany: bool,
+) -> None:
+    """Record statement start time for slow query detection"""
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def after_cursor_execute(
+    conn: Any,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: Any,
+    executemany: bool,
+) -> None:
+    """Time the statement and log it when it exceeds the slow query threshold"""
+    duration = time.perf_counter() - conn.info["query_start_time"].pop()
+    SQL_QUERY_DURATION.observe(duration)
+    duration_ms = duration * 1000
+    if duration_ms > SLOW_QUERY_THRESHOLD_MS:
+        logger.warning(
+            f"Slow query ({duration_ms:.1f} ms, request {request_id_var.get()}): "
+            f"{statement[:500]}"
+        )
 
 
 def init_db() -> Any:
@@ -87,6 +152,51 @@ def get_db() -> Session:
         db.close()
 
 
+def newest_first(
+    query: Any,
+    timestamp_column: Any,
+    id_column: Any,
+    before_ts: Optional[datetime] = None,
+    before_id: Optional[int] = None,
+) -> Any:
+    """Order ``query`` newest-first and apply a keyset cursor.
+
+    Rows strictly older than ``(before_ts, before_id)`` are returned, so the
+    last row of one page is the cursor for the next and no rows are skipped
+    with OFFSET. ``before_id`` only breaks ties between equal timestamps.
+    """
+    if before_ts is not None:
+        if before_id is not None:
+            query = query.filter(
+                tuple_(timestamp_column, id_column) < tuple_(before_ts, before_id)
+            )
+        else:
+            query = query.filter(timestamp_column < before_ts)
+    return query.order_by(timestamp_column.desc(), id_column.desc())
+
+
+def day_bucket(timestamp_column: Any) -> Any:
+    """Truncate ``timestamp_column`` to the start of its day for grouping.
+
+    Uses ``date_trunc`` on PostgreSQL, which keeps the column's type and
+    avoids a per-row cast; other backends fall back to ``date()``. Group by
+    the returned expression itself so both clauses share one computation.
+    """
+    if engine.dialect.name == "postgresql":
+        return func.date_trunc("day", timestamp_column)
+    return func.date(timestamp_column)
+
+
+def count_ids(query: Any, id_column: Any) -> int:
+    """Count the rows matched by ``query`` via a narrowed ``id``-only subquery.
+
+    Avoids counting over every mapped column (or a ``COUNT(*) OVER ()``
+    window) when a listing reports its total.
+    """
+    subquery = query.with_entities(id_column).order_by(None).subquery()
+    return query.session.query(func.count()).select_from(subquery).scalar()
+
+
 async def get_redis() -> Redis:
     """Get Redis client dependency"""
     global redis_client
@@ -2,14 +2,16 @@
 Authentication and security system for Quantis API
 """
 
+import base64
 import hashlib
+import inspect
 import io
 import logging
 import secrets
 import time
 from datetime import datetime, timedelta
-from functools import wraps
-from typing import Any, Dict, List, Optional
+from functools import lru_cache, wraps
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple, Union
 import pyotp
 import qrcode
 import redis.asyncio as redis
@@ -17,21 +19,28 @@ from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, select
+from sqlalchemy.orm import Session, joinedload
+from ..audit_buffer import audit_log_buffer
 from ..config import get_settings
 from ..database import get_db, get_redis
 from ..models import AuditLog
-from ..models import ApiKey, User, UserSession
+from ..models import ApiKey, Role, User, UserSession
 from ..schemas import Token
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 ALGORITHM = settings.security.algorithm
+# Built once rather than as a fresh list on every verification.
+_DECODE_ALGORITHMS = [ALGORITHM]
 SECRET_KEY = settings.security.secret_key
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.security.access_token_expire_minutes
 REFRESH_TOKEN_EXPIRE_DAYS = settings.security.refresh_token_expire_days
 bearer_scheme = HTTPBearer(auto_error=False)
+# Verified token payloads are reused for this long, never past their ``exp``.
+TOKEN_CACHE_TTL_SECONDS = 60
+_TOKEN_CACHE_SIZE = 10_000
 
 
 class SecurityManager:
@@ -40,6 +49,8 @@ class SecurityManager:
     def __init__(self) -> None:
         self.pwd_context = pwd_context
         self.failed_attempts = {}
+        # Keyed by a truncated SHA-256 of the token; raw tokens aren't kept.
+        self._token_cache: Dict[bytes, Tuple[float, Dict[str, Any]]] = {}
 
     def hash_password(self, password: str) -> str:
         """Hash a password"""
@@ -63,13 +74,34 @@ class SecurityManager:
         return encoded_jwt
 
     def verify_token(self, token: str) -> Optional[Dict[str, Any]]:
-        """Verify and decode a JWT token"""
+        """Verify and decode a JWT token.
+
+        Successful decodes are cached for ``TOKEN_CACHE_TTL_SECONDS``, clamped
+        to the token's ``exp``, so a client reusing its token skips the
+        signature check. Failures are never cached.
+        """
+        # A JWS has exactly three segments; anything else can't verify, so
+        # reject it before parsing the header or computing the HMAC.
+        if token.count(".") != 2:
+            logger.warning("Token verification failed: malformed token")
+            return None
+        key = hashlib.sha256(token.encode()).digest()[:16]
+        now = time.monotonic()
+        entry = self._token_cache.get(key)
+        if entry is not None and entry[0] > now:
+            return dict(entry[1])
         try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-            return payload
+            payload = jwt.decode(token, SECRET_KEY, algorithms=_DECODE_ALGORITHMS)
         except JWTError as e:
             logger.warning(f"Token verification failed: {e}")
             return None
+        expires = now + TOKEN_CACHE_TTL_SECONDS
+        if isinstance(payload.get("exp"), (int, float)):
+            expires = min(expires, now + payload["exp"] - time.time())
+        if len(self._token_cache) >= _TOKEN_CACHE_SIZE:
+            self._token_cache.clear()
+        self._token_cache[key] = (expires, payload)
+        return dict(payload)
 
     def create_access_token(
         self, user_id: int, username: str, role: str, permissions: List[str]
@@ -162,8 +194,6 @@ class SecurityManager:
         img = qrcode.make(uri)
         buffer = io.BytesIO()
         img.save(buffer, format="PNG")
-        import base64
-
         return base64.b64encode(buffer.getvalue()).decode("utf-8")
 
 
@@ -271,7 +301,23 @@ def rate_limit(requests: int = 100, window: int = 60) -> Any:
     return decorator
 
 
-async def get_current_user_from_token(
+# Loads the role and its permissions with the user, so permission checks
+# later in the request don't go back to the database.
+_USER_PERMISSIONS = joinedload(User.role).selectinload(Role.permissions)
+# Every authenticated request runs this lookup, so the statement is built once;
+# only the user_id parameter changes between executions.
+_ACTIVE_USER = (
+    select(User)
+    .options(_USER_PERMISSIONS)
+    .where(
+        User.id == bindparam("user_id"),
+        User.is_active == True,
+        User.is_deleted == False,
+    )
+)
+
+
+def get_current_user_from_token(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
     db: Session = Depends(get_db),
     mfa_code: Optional[str] = None,
@@ -303,13 +349,7 @@ async def get_current_user_from_token(
             detail="Invalid token payload",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    user = (
-        db.query(User)
-        .filter(
-            User.id == int(user_id), User.is_active == True, User.is_deleted == False
-        )
-        .first()
-    )
+    user = db.scalar(_ACTIVE_USER, {"user_id": int(user_id)})
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -337,7 +377,7 @@ async def get_current_user_from_token(
     return user
 
 
-async def get_current_user_from_api_key(
+def get_current_user_from_api_key(
     request: Request, db: Session = Depends(get_db)
 ) -> Optional[User]:
     """Get current user from API key"""
@@ -364,15 +404,7 @@ async def get_current_user_from_api_key(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="API Key not authorized from this IP address",
         )
-    user = (
-        db.query(User)
-        .filter(
-            User.id == api_key_obj.user_id,
-            User.is_active == True,
-            User.is_deleted == False,
-        )
-        .first()
-    )
+    user = db.scalar(_ACTIVE_USER, {"user_id": api_key_obj.user_id})
     if not user:
         return None
     api_key_obj.last_used = datetime.utcnow()
@@ -381,44 +413,62 @@ async def get_current_user_from_api_key(
     return user
 
 
-async def get_current_user(
+def get_current_user(
     request: Request,
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
     db: Session = Depends(get_db),
 ) -> User:
     """Get current user from either JWT token or API key"""
-    user = await get_current_user_from_api_key(request, db)
+    user = get_current_user_from_api_key(request, db)
     if user:
         return user
-    return await get_current_user_from_token(credentials, db)
+    return get_current_user_from_token(credentials, db)
 
 
-def require_permission(required_permissions: List[str]) -> Any:
-    """Decorator to require specific user permissions"""
+def require_permission(required_permissions: Union[str, List[str]]) -> Any:
+    """Decorator to require specific user permissions.
+
+    Works on both ``def`` and ``async def`` endpoints; sync endpoints keep a
+    sync wrapper so FastAPI still runs them in its threadpool. For checks
+    inside a handler, test membership in ``current_user.permission_set``.
+    """
+    if isinstance(required_permissions, str):
+        required_permissions = [required_permissions]
+    return _permission_decorator(frozenset(required_permissions))
+
+
+@lru_cache(maxsize=None)
+def _permission_decorator(required: FrozenSet[str]) -> Any:
+    # Shared by every route guarded by the same permissions.
+    def check(args: Any, kwargs: Dict[str, Any]) -> None:
+        current_user = kwargs.get("current_user")
+        if not isinstance(current_user, User):
+            current_user = next((arg for arg in args if isinstance(arg, User)), None)
+        if not current_user:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Authentication required",
+            )
+        if not required <= current_user.permission_set:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Insufficient permissions",
+            )
 
     def decorator(func):
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                check(args, kwargs)
+                return await func(*args, **kwargs)
+
+            return async_wrapper
 
         @wraps(func)
-        async def wrapper(*args, **kwargs):
-            current_user = None
-            for arg in args:
-                if isinstance(arg, User):
-                    current_user = arg
-                    break
-            if not current_user:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Authentication required",
-                )
-            user_permissions = set(
-                [p.permission_name for p in current_user.role.permissions]
-            )
-            if not all((perm in user_permissions for perm in required_permissions)):
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="Insufficient permissions",
-                )
-            return await func(*args, **kwargs)
+        def wrapper(*args, **kwargs):
+            check(args, kwargs)
+            return func(*args, **kwargs)
 
         return wrapper
 
@@ -458,22 +508,31 @@ class AuditLogger:
         request: Optional[Request] = None,
         status_code: Optional[int] = None,
     ) -> Any:
-        """Log an audit event"""
-        audit_log = AuditLog(
-            user_id=user_id,
-            action=action,
-            resource_type=resource_type,
-            resource_id=resource_id,
-            resource_name=resource_name,
-            details=details or {},
-            status_code=status_code,
-        )
+        """Log an audit event.
+
+        While the application's audit log buffer is running the entry is queued
+        for its next bulk flush, keeping the INSERT and commit off the request
+        path. Otherwise (scripts, tests without the lifespan) it is written
+        through ``db`` immediately.
+        """
+        row = {
+            "user_id": user_id,
+            "action": action,
+            "resource_type": resource_type,
+            "resource_id": resource_id,
+            "resource_name": resource_name,
+            "details": details or {},
+            "status_code": status_code,
+        }
         if request:
-            audit_log.ip_address = request.client.host
-            audit_log.user_agent = request.headers.get("user-agent")
-            audit_log.endpoint = str(request.url.path)
-            audit_log.method = request.method
-        db.add(audit_log)
+            row["ip_address"] = request.client.host
+            row["user_agent"] = request.headers.get("user-agent")
+            row["endpoint"] = str(request.url.path)
+            row["method"] = request.method
+        if audit_log_buffer.running:
+            audit_log_buffer.add(row)
+            return
+        db.add(AuditLog(**row))
         db.commit()
 
     @staticmethod
@@ -520,23 +579,23 @@ class AuditLogger:
         )
 
 
-async def get_current_user_with_mfa(
+def get_current_user_with_mfa(
     request: Request,
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
     db: Session = Depends(get_db),
 ) -> User:
     """Dependency to get current user, requiring MFA if enabled"""
     mfa_code = request.headers.get("X-MFA-Code")
-    return await get_current_user_from_token(credentials, db, mfa_code)
+    return get_current_user_from_token(credentials, db, mfa_code)
 
 
-async def get_current_user_for_mfa_setup(
+def get_current_user_for_mfa_setup(
     request: Request,
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
     db: Session = Depends(get_db),
 ) -> User:
     """Dependency to get current user without MFA check for MFA setup/disable endpoints"""
-    return await get_current_user_from_token(credentials, db, mfa_code=None)
+    return get_current_user_from_token(credentials, db, mfa_code=None)
 
 
 async def create_user_session(
@@ -654,13 +713,7 @@ def refresh_access_token(db: Session, refresh_token: str) -> Optional[Token]:
     user_id = payload.get("sub")
     if not user_id:
         return None
-    user = (
-        db.query(User)
-        .filter(
-            User.id == int(user_id), User.is_active == True, User.is_deleted == False
-        )
-        .first()
-    )
+    user = db.scalar(_ACTIVE_USER, {"user_id": int(user_id)})
     if not user:
         return None
     session = (
@@ -21,6 +21,7 @@ from fastapi import (
     UploadFile,
     status,
 )
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 
 from ..auth import AuditLogger, get_current_user, require_permission
@@ -219,7 +220,7 @@ async def get_datasets(
     """Get datasets for the current user or all datasets for admin."""
     DatasetService(db)
 
-    if require_permission("read_all_datasets")(current_user):
+    if "read_all_datasets" in current_user.permission_set:
         query = db.query(Dataset).filter(Dataset.is_deleted == False)
     else:
         query = db.query(Dataset).filter(
@@ -236,7 +237,7 @@ async def get_datasets(
         resource_type="dataset",
         resource_name=(
             "all_datasets"
-            if require_permission("read_all_datasets")(current_user)
+            if "read_all_datasets" in current_user.permission_set
             else "user_datasets"
         ),
         request=request,
@@ -264,7 +265,7 @@ async def get_dataset(
 
     if not (
         dataset.owner_id == current_user.id
-        or require_permission("read_all_datasets")(current_user)
+        or "read_all_datasets" in current_user.permission_set
     ):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Access denied"
@@ -307,7 +308,7 @@ async def update_dataset(
 
     if not (
         dataset.owner_id == current_user.id
-        or require_permission("update_all_datasets")(current_user)
+        or "update_all_datasets" in current_user.permission_set
     ):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Access denied"
@@ -362,7 +363,7 @@ async def delete_dataset(
 
     if not (
         dataset.owner_id == current_user.id
-        or require_permission("delete_all_datasets")(current_user)
+        or "delete_all_datasets" in current_user.permission_set
     ):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Access denied"
@@ -420,7 +421,7 @@ async def get_dataset_statistics(
 
     if not (
         dataset.owner_id == current_user.id
-        or require_permission("read_all_dataset_stats")(current_user)
+        or "read_all_dataset_stats" in current_user.permission_set
     ):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Access denied"
@@ -474,7 +475,7 @@ async def preview_dataset(
 
     if not (
         dataset.owner_id == current_user.id
-        or require_permission("read_all_dataset_preview")(current_user)
+        or "read_all_dataset_preview" in current_user.permission_set
     ):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Access denied"
@@ -531,7 +532,7 @@ async def download_dataset(
 
     if not (
         dataset.owner_id == current_user.id
-        or require_permission("download_all_datasets")(current_user)
+        or "download_all_datasets" in current_user.permission_set
     ):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Access denied"
@@ -556,8 +557,6 @@ async def download_dataset(
             data.to_parquet(tmp_file.name, index=False)
             media_type = "application/octet-stream"
 
-        from fastapi.responses import FileResponse
-
         AuditLogger.log_event(
             db=db,
             user_id=current_user.id,
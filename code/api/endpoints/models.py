@@ -2,20 +2,34 @@
 Model management endpoints
 """
 
-from typing import List, Optional, Any
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+import re
+from datetime import datetime
+from typing import Iterator, List, Optional, Any
+import orjson
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
-from ..database import get_db
+from ..config import get_settings
+from ..database import SessionLocal, get_db
 from ..middleware.auth import (
     readonly_or_above,
     user_or_admin_required,
     validate_api_key,
 )
+from ..responses import (
+    STREAM_BATCH_SIZE,
+    etag_response,
+    iter_batches,
+    json_response,
+    make_etag,
+    stream_json_array,
+)
 from ..services.dataset_service import DatasetService
 from ..services.model_service import ModelService
 from ..services.user_service import UserService
 
+# Handlers that touch the database are plain ``def``: the session is synchronous,
+# so FastAPI runs them in its threadpool rather than on the event loop.
 router = APIRouter()
 
 
@@ -40,9 +54,9 @@ class ModelResponse(BaseModel):
     metrics: Optional[dict]
     status: str
     file_path: Optional[str]
-    created_at: str
-    updated_at: Optional[str]
-    trained_at: Optional[str]
+    created_at: datetime
+    updated_at: Optional[datetime]
+    trained_at: Optional[datetime]
 
 
 class ModelTrainingRequest(BaseModel):
@@ -58,8 +72,82 @@ class ModelMetrics(BaseModel):
     epochs: Optional[int]
 
 
+# Comma-separated integer IDs accepted by /models/compare.
+_MODEL_IDS_RE = re.compile(r"\s*\d+\s*(?:,\s*\d+\s*)*")
+_MODEL_ID_RE = re.compile(r"\d+")
+
+# Static catalogue served by /models/types; serialized once at import time.
+_MODEL_TYPES_JSON = orjson.dumps(
+    {
+        "model_types": [
+            {
+                "type": "tft",
+                "name": "Temporal Fusion Transformer",
+                "description": "Advanced transformer model for time series forecasting with attention mechanisms",
+                "suitable_for": ["time_series", "forecasting", "multivariate"],
+            },
+            {
+                "type": "lstm",
+                "name": "Long Short-Term Memory",
+                "description": "Recurrent neural network for sequence modeling and time series prediction",
+                "suitable_for": ["time_series", "sequence_modeling", "forecasting"],
+            },
+            {
+                "type": "arima",
+                "name": "AutoRegressive Integrated Moving Average",
+                "description": "Statistical model for time series analysis and forecasting",
+                "suitable_for": ["time_series", "univariate", "statistical_analysis"],
+            },
+            {
+                "type": "linear",
+                "name": "Linear Regression",
+                "description": "Simple linear model for regression tasks",
+                "suitable_for": ["regression", "baseline", "interpretable"],
+            },
+            {
+                "type": "random_forest",
+                "name": "Random Forest",
+                "description": "Ensemble method using multiple decision trees",
+                "suitable_for": ["regression", "classification", "feature_importance"],
+            },
+            {
+                "type": "xgboost",
+                "name": "XGBoost",
+                "description": "Gradient boosting framework for structured data",
+                "suitable_for": ["regression", "classification", "high_performance"],
+            },
+        ]
+    }
+)
+_MODEL_TYPES_ETAG = make_etag(_MODEL_TYPES_JSON)
+
+
+def _model_payload(model: Any, owner_username: str, dataset_name: str) -> dict:
+    """Build the ``ModelResponse`` shape as a plain dict for orjson encoding.
+
+    Datetimes are passed through as-is; orjson emits them as ISO-8601.
+    """
+    return {
+        "id": model.id,
+        "name": model.name,
+        "description": model.description,
+        "model_type": model.model_type,
+        "owner_id": model.owner_id,
+        "owner_username": owner_username,
+        "dataset_id": model.dataset_id,
+        "dataset_name": dataset_name,
+        "hyperparameters": model.hyperparameters,
+        "metrics": model.metrics,
+        "status": model.status,
+        "file_path": model.file_path,
+        "created_at": model.created_at,
+        "updated_at": model.updated_at,
+        "trained_at": model.trained_at,
+    }
+
+
 @router.post("/models", response_model=ModelResponse)
-async def create_model(
+def create_model(
     model_data: ModelCreate,
     current_user: dict = Depends(user_or_admin_required),
     db: Session = Depends(get_db),
@@ -81,29 +169,15 @@ async def create_model(
             dataset_id=model_data.dataset_id,
             hyperparameters=model_data.hyperparameters,
         )
-        return ModelResponse(
-            id=model.id,
-            name=model.name,
-            description=model.description,
-            model_type=model.model_type,
-            owner_id=model.owner_id,
-            owner_username=current_user["username"],
-            dataset_id=model.dataset_id,
-            dataset_name=dataset.name,
-            hyperparameters=model.hyperparameters,
-            metrics=model.metrics,
-            status=model.status,
-            file_path=model.file_path,
-            created_at=model.created_at.isoformat(),
-            updated_at=model.updated_at.isoformat() if model.updated_at else None,
-            trained_at=model.trained_at.isoformat() if model.trained_at else None,
+        return json_response(
+            _model_payload(model, current_user["username"], dataset.name)
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/models", response_model=List[ModelResponse])
-async def get_models(
+def get_models(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     status: Optional[str] = Query(None),
@@ -114,43 +188,32 @@ async def get_models(
     """Get models for the current user."""
     model_service = ModelService(db)
     dataset_service = DatasetService(db)
-    if current_user["role"] == "admin":
-        models = model_service.get_all_models(skip, limit)
-    else:
-        models = model_service.get_models_by_owner(current_user["user_id"], skip, limit)
-    if status:
-        models = [m for m in models if m.status == status]
-    if model_type:
-        models = [m for m in models if m.model_type == model_type]
+    owner_id = None if current_user["role"] == "admin" else current_user["user_id"]
+    models = model_service.stream_models(
+        owner_id, skip, limit, status, model_type, STREAM_BATCH_SIZE
+    )
     user_service = UserService(db)
-    result = []
-    for model in models:
-        owner = user_service.get_user_by_id(model.owner_id)
-        dataset = dataset_service.get_dataset_by_id(model.dataset_id)
-        result.append(
-            ModelResponse(
-                id=model.id,
-                name=model.name,
-                description=model.description,
-                model_type=model.model_type,
-                owner_id=model.owner_id,
-                owner_username=owner.username if owner else "Unknown",
-                dataset_id=model.dataset_id,
-                dataset_name=dataset.name if dataset else "Unknown",
-                hyperparameters=model.hyperparameters,
-                metrics=model.metrics,
-                status=model.status,
-                file_path=model.file_path,
-                created_at=model.created_at.isoformat(),
-                updated_at=model.updated_at.isoformat() if model.updated_at else None,
-                trained_at=model.trained_at.isoformat() if model.trained_at else None,
+
+    # Owner and dataset names are resolved once per fetched batch with IN
+    # queries, so a page costs a few queries regardless of its size.
+    def payloads() -> Iterator[dict]:
+        for batch in iter_batches(models, STREAM_BATCH_SIZE):
+            owners = user_service.get_usernames_by_ids(m.owner_id for m in batch)
+            datasets = dataset_service.get_dataset_names_by_ids(
+                m.dataset_id for m in batch
             )
-        )
-    return result
+            for model in batch:
+                yield _model_payload(
+                    model,
+                    owners.get(model.owner_id, "Unknown"),
+                    datasets.get(model.dataset_id, "Unknown"),
+                )
+
+    return stream_json_array(payloads(), lambda payload: payload, db)
 
 
 @router.get("/models/{model_id}", response_model=ModelResponse)
-async def get_model(
+def get_model(
     model_id: int,
     current_user: dict = Depends(validate_api_key),
     db: Session = Depends(get_db),
@@ -158,35 +221,25 @@ async def get_model(
     """Get model by ID."""
     model_service = ModelService(db)
     dataset_service = DatasetService(db)
-    model = model_service.get_model_by_id(model_id)
+    model = model_service.get_model_for_user(
+        model_id, current_user["user_id"], current_user["role"] == "admin"
+    )
     if not model:
         raise HTTPException(status_code=404, detail="Model not found")
-    if current_user["role"] != "admin" and model.owner_id != current_user["user_id"]:
-        raise HTTPException(status_code=403, detail="Access denied")
     user_service = UserService(db)
     owner = user_service.get_user_by_id(model.owner_id)
     dataset = dataset_service.get_dataset_by_id(model.dataset_id)
-    return ModelResponse(
-        id=model.id,
-        name=model.name,
-        description=model.description,
-        model_type=model.model_type,
-        owner_id=model.owner_id,
-        owner_username=owner.username if owner else "Unknown",
-        dataset_id=model.dataset_id,
-        dataset_name=dataset.name if dataset else "Unknown",
-        hyperparameters=model.hyperparameters,
-        metrics=model.metrics,
-        status=model.status,
-        file_path=model.file_path,
-        created_at=model.created_at.isoformat(),
-        updated_at=model.updated_at.isoformat() if model.updated_at else None,
-        trained_at=model.trained_at.isoformat() if model.trained_at else None,
+    return json_response(
+        _model_payload(
+            model,
+            owner.username if owner else "Unknown",
+            dataset.name if dataset else "Unknown",
+        )
     )
 
 
 @router.put("/models/{model_id}", response_model=ModelResponse)
-async def update_model(
+def update_model(
     model_id: int,
     model_update: ModelCreate,
     current_user: dict = Depends(validate_api_key),
@@ -194,11 +247,11 @@ async def update_model(
 ):
     """Update model information."""
     model_service = ModelService(db)
-    model = model_service.get_model_by_id(model_id)
+    model = model_service.get_model_for_user(
+        model_id, current_user["user_id"], current_user["role"] == "admin"
+    )
     if not model:
         raise HTTPException(status_code=404, detail="Model not found")
-    if current_user["role"] != "admin" and model.owner_id != current_user["user_id"]:
-        raise HTTPException(status_code=403, detail="Access denied")
     updated_model = model_service.update_model(
         model_id,
         name=model_update.name,
@@ -210,50 +263,45 @@ async def update_model(
         raise HTTPException(status_code=500, detail="Failed to update model")
     dataset_service = DatasetService(db)
     dataset = dataset_service.get_dataset_by_id(updated_model.dataset_id)
-    return ModelResponse(
-        id=updated_model.id,
-        name=updated_model.name,
-        description=updated_model.description,
-        model_type=updated_model.model_type,
-        owner_id=updated_model.owner_id,
-        owner_username=current_user["username"],
-        dataset_id=updated_model.dataset_id,
-        dataset_name=dataset.name if dataset else "Unknown",
-        hyperparameters=updated_model.hyperparameters,
-        metrics=updated_model.metrics,
-        status=updated_model.status,
-        file_path=updated_model.file_path,
-        created_at=updated_model.created_at.isoformat(),
-        updated_at=(
-            updated_model.updated_at.isoformat() if updated_model.updated_at else None
-        ),
-        trained_at=(
-            updated_model.trained_at.isoformat() if updated_model.trained_at else None
-        ),
+    return json_response(
+        _model_payload(
+            updated_model,
+            current_user["username"],
+            dataset.name if dataset else "Unknown",
+        )
     )
 
 
 @router.delete("/models/{model_id}")
-async def delete_model(
+def delete_model(
     model_id: int,
     current_user: dict = Depends(validate_api_key),
     db: Session = Depends(get_db),
 ):
     """Delete model."""
     model_service = ModelService(db)
-    model = model_service.get_model_by_id(model_id)
+    model = model_service.get_model_for_user(
+        model_id, current_user["user_id"], current_user["role"] == "admin"
+    )
     if not model:
         raise HTTPException(status_code=404, detail="Model not found")
-    if current_user["role"] != "admin" and model.owner_id != current_user["user_id"]:
-        raise HTTPException(status_code=403, detail="Access denied")
     success = model_service.delete_model(model_id)
     if not success:
         raise HTTPException(status_code=500, detail="Failed to delete model")
     return {"message": "Model deleted successfully"}
 
 
+def _train_in_process(model_id: int) -> None:
+    """Fallback for deployments without a Celery broker."""
+    db = SessionLocal()
+    try:
+        ModelService(db).train_dummy_model(model_id)
+    finally:
+        db.close()
+
+
 @router.post("/models/{model_id}/train")
-async def train_model(
+def train_model(
     model_id: int,
     training_request: ModelTrainingRequest,
     background_tasks: BackgroundTasks,
@@ -262,95 +310,96 @@ async def train_model(
 ):
     """Start model training."""
     model_service = ModelService(db)
-    model = model_service.get_model_by_id(model_id)
+    model = model_service.get_model_for_user(
+        model_id, current_user["user_id"], current_user["role"] == "admin"
+    )
     if not model:
         raise HTTPException(status_code=404, detail="Model not found")
-    if current_user["role"] != "admin" and model.owner_id != current_user["user_id"]:
-        raise HTTPException(status_code=403, detail="Access denied")
     if model.status == "training":
         raise HTTPException(status_code=400, detail="Model is already training")
     if training_request.hyperparameters:
         model_service.update_model(
             model_id, hyperparameters=training_request.hyperparameters
         )
+    if get_settings().celery_broker_url:
+        # With a broker, training runs on a Celery worker so it never occupies
+        # an API worker; /training-status reads the row the worker updates.
+        # Celery is only imported once a broker is actually configured.
+        from ..tasks import train_dummy_model_task
 
-    def train_model_task() -> Any:
-        model_service.train_dummy_model(model_id)
-
-    background_tasks.add_task(train_model_task)
+        train_dummy_model_task.delay(model_id)
+    else:
+        background_tasks.add_task(_train_in_process, model_id)
     return {"message": "Model training started", "model_id": model_id}
 
 
 @router.get("/models/{model_id}/training-status")
-async def get_training_status(
+def get_training_status(
     model_id: int,
     current_user: dict = Depends(validate_api_key),
     db: Session = Depends(get_db),
 ):
     """Get model training status."""
     model_service = ModelService(db)
-    model = model_service.get_model_by_id(model_id)
+    model = model_service.get_model_for_user(
+        model_id, current_user["user_id"], current_user["role"] == "admin"
+    )
     if not model:
         raise HTTPException(status_code=404, detail="Model not found")
-    if current_user["role"] != "admin" and model.owner_id != current_user["user_id"]:
-        raise HTTPException(status_code=403, detail="Access denied")
     return {
         "model_id": model.id,
         "status": model.status,
         "metrics": model.metrics,
-        "trained_at": model.trained_at.isoformat() if model.trained_at else None,
+        "trained_at": model.trained_at,
         "file_path": model.file_path,
     }
 
 
 @router.get("/models/{model_id}/metrics", response_model=ModelMetrics)
-async def get_model_metrics(
+def get_model_metrics(
     model_id: int,
     current_user: dict = Depends(readonly_or_above),
     db: Session = Depends(get_db),
 ):
     """Get model training metrics."""
     model_service = ModelService(db)
-    model = model_service.get_model_by_id(model_id)
-    if not model:
+    row = model_service.get_model_metrics_for_user(
+        model_id, current_user["user_id"], current_user["role"] in ["admin", "readonly"]
+    )
+    if row is None:
         raise HTTPException(status_code=404, detail="Model not found")
-    if (
-        current_user["role"] not in ["admin", "readonly"]
-        and model.owner_id != current_user["user_id"]
-    ):
-        raise HTTPException(status_code=403, detail="Access denied")
-    if not model.metrics:
+    if not row.metrics:
         raise HTTPException(
             status_code=404, detail="No metrics available for this model"
         )
-    return ModelMetrics(**model.metrics)
+    return ModelMetrics(**row.metrics)
 
 
 @router.get("/models/compare")
-async def compare_models(
+def compare_models(
     model_ids: str = Query(..., description="Comma-separated list of model IDs"),
     current_user: dict = Depends(validate_api_key),
     db: Session = Depends(get_db),
 ):
     """Compare multiple models."""
-    model_service = ModelService(db)
-    try:
-        model_id_list = [int(id.strip()) for id in model_ids.split(",")]
-    except ValueError:
+    if not _MODEL_IDS_RE.fullmatch(model_ids):
         raise HTTPException(status_code=400, detail="Invalid model IDs format")
+    model_id_list = [int(model_id) for model_id in _MODEL_ID_RE.findall(model_ids)]
     if len(model_id_list) > 10:
         raise HTTPException(
             status_code=400, detail="Cannot compare more than 10 models at once"
         )
+    model_service = ModelService(db)
+    models_by_id = {
+        model.id: model for model in model_service.get_models_by_ids(model_id_list)
+    }
+    can_read_all = current_user["role"] in ["admin", "readonly"]
     comparison_data = []
     for model_id in model_id_list:
-        model = model_service.get_model_by_id(model_id)
+        model = models_by_id.get(model_id)
         if not model:
             continue
-        if (
-            current_user["role"] not in ["admin", "readonly"]
-            and model.owner_id != current_user["user_id"]
-        ):
+        if not can_read_all and model.owner_id != current_user["user_id"]:
             continue
         comparison_data.append(
             {
@@ -359,54 +408,20 @@ async def compare_models(
                 "model_type": model.model_type,
                 "status": model.status,
                 "metrics": model.metrics,
-                "trained_at": (
-                    model.trained_at.isoformat() if model.trained_at else None
-                ),
+                "trained_at": model.trained_at,
             }
         )
     return {"models": comparison_data, "comparison_count": len(comparison_data)}
 
 
 @router.get("/models/types")
-async def get_model_types(current_user: dict = Depends(readonly_or_above)):
+async def get_model_types(
+    request: Request, current_user: dict = Depends(readonly_or_above)
+):
     """Get available model types and their descriptions."""
-    return {
-        "model_types": [
-            {
-                "type": "tft",
-                "name": "Temporal Fusion Transformer",
-                "description": "Advanced transformer model for time series forecasting with attention mechanisms",
-                "suitable_for": ["time_series", "forecasting", "multivariate"],
-            },
-            {
-                "type": "lstm",
-                "name": "Long Short-Term Memory",
-                "description": "Recurrent neural network for sequence modeling and time series prediction",
-                "suitable_for": ["time_series", "sequence_modeling", "forecasting"],
-            },
-            {
-                "type": "arima",
-                "name": "AutoRegressive Integrated Moving Average",
-                "description": "Statistical model for time series analysis and forecasting",
-                "suitable_for": ["time_series", "univariate", "statistical_analysis"],
-            },
-            {
-                "type": "linear",
-                "name": "Linear Regression",
-                "description": "Simple linear model for regression tasks",
-                "suitable_for": ["regression", "baseline", "interpretable"],
-            },
-            {
-                "type": "random_forest",
-                "name": "Random Forest",
-                "description": "Ensemble method using multiple decision trees",
-                "suitable_for": ["regression", "classification", "feature_importance"],
-            },
-            {
-                "type": "xgboost",
-                "name": "XGBoost",
-                "description": "Gradient boosting framework for structured data",
-                "suitable_for": ["regression", "classification", "high_performance"],
-            },
-        ]
-    }
+    return etag_response(
+        request,
+        _MODEL_TYPES_JSON,
+        "public, max-age=3600",
+        etag=_MODEL_TYPES_ETAG,
+    )
@@ -2,24 +2,133 @@
 Monitoring and system health endpoints
 """
 
+import logging
+import threading
+import time
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
+import orjson
 import psutil
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from pydantic import BaseModel
-from sqlalchemy import func, text
+from sqlalchemy import func, insert, select, text
 from sqlalchemy.orm import Session
 
 # Local application imports - adjust if your project layout differs
-from ..database import get_db
-import models
+from .. import models
+from ..audit_buffer import audit_log_buffer
+from ..database import count_ids, day_bucket, get_db, newest_first
+from ..responses import (
+    STREAM_BATCH_SIZE,
+    etag_response,
+    iter_batches,
+    stream_json_array,
+)
 from ..services.user_service import UserService
 from ..auth import get_current_user, require_admin
 from ..models import User
 
+logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# /stats and /analytics/models aggregate over whole tables and are not
+# user-scoped, so dashboard polling within this window is served from memory.
+_AGGREGATE_TTL_SECONDS = 60.0
+_aggregate_cache: Dict[str, Tuple[float, Any]] = {}
+# Analytics responses carry an ETag; clients may reuse them briefly.
+_ANALYTICS_CACHE_CONTROL = "private, max-age=30, stale-while-revalidate=60"
+
+
+@dataclass(frozen=True)
+class HealthSnapshot:
+    cpu_percent: float
+    memory: Any
+    disk_usage: Any
+
+
+class _HealthSampler:
+    """Samples CPU, memory and disk usage on a daemon thread.
+
+    /health reads the latest snapshot instead of calling psutil itself, so
+    the request path never blocks on a measurement.
+    """
+
+    def __init__(self, interval: float = 1.0) -> None:
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._snapshot: Optional[HealthSnapshot] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        # The first non-blocking call only primes psutil's CPU counters.
+        psutil.cpu_percent(interval=None)
+        self._sample()
+        self._thread = threading.Thread(
+            target=self._run, name="health-sampler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval)
+            self._thread = None
+        # Nothing refreshes the snapshot any more; don't serve it.
+        with self._lock:
+            self._snapshot = None
+
+    def snapshot(self) -> HealthSnapshot:
+        with self._lock:
+            snapshot = self._snapshot
+        if snapshot is None:
+            # Sampler not running (e.g. router mounted without the app
+            # lifespan): measure now, but don't keep it, or it would go stale.
+            snapshot = self._measure()
+        return snapshot
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def _sample(self) -> None:
+        snapshot = self._measure()
+        with self._lock:
+            self._snapshot = snapshot
+
+    @staticmethod
+    def _measure() -> HealthSnapshot:
+        return HealthSnapshot(
+            cpu_percent=psutil.cpu_percent(interval=None),
+            memory=psutil.virtual_memory(),
+            disk_usage=psutil.disk_usage("/"),
+        )
+
+
+# Started and stopped by the application lifespan.
+health_sampler = _HealthSampler()
+
+
+def _cached_aggregate(
+    key: str, compute: Callable[[], Any], refresh: bool = False
+) -> Any:
+    """Return the cached value for ``key``, recomputing it once it expires.
+
+    ``refresh`` forces a recompute and restarts the TTL for later callers.
+    """
+    now = time.monotonic()
+    entry = _aggregate_cache.get(key)
+    if not refresh and entry is not None and entry[0] > now:
+        return entry[1]
+    value = compute()
+    _aggregate_cache[key] = (now + _AGGREGATE_TTL_SECONDS, value)
+    return value
+
 
 # -----------------------
 # Pydantic response models
@@ -81,7 +190,7 @@ class MetricEntry(BaseModel):
 # System health endpoints
 # -----------------------
 @router.get("/health", response_model=SystemHealth)
-async def get_system_health(
+def get_system_health(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
@@ -94,9 +203,9 @@ async def get_system_health(
         database_status = "unhealthy"
 
     # Get system metrics
-    disk_usage = psutil.disk_usage("/")
-    memory = psutil.virtual_memory()
-    cpu_percent = psutil.cpu_percent(interval=1)
+    snapshot = health_sampler.snapshot()
+    disk_usage, memory = snapshot.disk_usage, snapshot.memory
+    cpu_percent = snapshot.cpu_percent
 
     # Determine overall status
     overall_status = "healthy"
@@ -130,73 +239,86 @@ async def get_system_health(
 # System usage statistics
 # --------------------------
 @router.get("/stats", response_model=SystemStats)
-async def get_system_statistics(
+def get_system_statistics(
+    fresh: bool = Query(False, description="Bypass the cached statistics (admin)"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Get system usage statistics."""
-
-    # Count totals (only active users in total_users as the original did)
-    total_users = db.query(models.User).filter(models.User.is_active.is_(True)).count()
-
-    # Active users (logged in within last 30 days)
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    active_users = (
-        db.query(models.User)
-        .filter(
-            models.User.is_active.is_(True),
-            models.User.last_login >= thirty_days_ago,
-        )
-        .count()
-    )
-
-    total_datasets = (
-        db.query(models.Dataset).filter(models.Dataset.is_active.is_(True)).count()
+    # Only admins may force a recount; everyone else shares the cached result.
+    refresh = (
+        fresh
+        and current_user.role is not None
+        and current_user.role.role_name == "admin"
     )
-    total_models = (
-        db.query(models.Model).filter(models.Model.is_active.is_(True)).count()
-    )
-    trained_models = (
-        db.query(models.Model)
-        .filter(models.Model.is_active.is_(True), models.Model.status == "trained")
-        .count()
+    return _cached_aggregate(
+        "stats", lambda: _compute_system_statistics(db), refresh=refresh
     )
 
-    total_predictions = db.query(models.Prediction).count()
 
-    # Predictions in last 24 hours
-    twenty_four_hours_ago = datetime.utcnow() - timedelta(hours=24)
-    predictions_last_24h = (
-        db.query(models.Prediction)
-        .filter(models.Prediction.created_at >= twenty_four_hours_ago)
-        .count()
-    )
+def _count(model: Any, *criteria: Any) -> Any:
+    return select(func.count()).select_from(model).where(*criteria).scalar_subquery()
+
+
+def _compute_system_statistics(db: Session) -> SystemStats:
+    # The independent counts are fused into a single SELECT of scalar
+    # subqueries, so the whole endpoint costs one round trip.
+    now = datetime.utcnow()
+    thirty_days_ago = now - timedelta(days=30)
+    twenty_four_hours_ago = now - timedelta(hours=24)
+    row = db.execute(
+        select(
+            # Only active users count towards total_users
+            _count(models.User, models.User.is_active.is_(True)).label("total_users"),
+            # Active users (logged in within last 30 days)
+            _count(
+                models.User,
+                models.User.is_active.is_(True),
+                models.User.last_login >= thirty_days_ago,
+            ).label("active_users"),
+            _count(models.Dataset, models.Dataset.is_active.is_(True)).label(
+                "total_datasets"
+            ),
+            _count(models.Model, models.Model.is_active.is_(True)).label(
+                "total_models"
+            ),
+            _count(
+                models.Model,
+                models.Model.is_active.is_(True),
+                models.Model.status == "trained",
+            ).label("trained_models"),
+            _count(models.Prediction).label("total_predictions"),
+            _count(
+                models.Prediction,
+                models.Prediction.created_at >= twenty_four_hours_ago,
+            ).label("predictions_last_24h"),
+        )
+    ).one()
 
-    return SystemStats(
-        total_users=total_users,
-        active_users=active_users,
-        total_datasets=total_datasets,
-        total_models=total_models,
-        trained_models=trained_models,
-        total_predictions=total_predictions,
-        predictions_last_24h=predictions_last_24h,
-    )
+    return SystemStats(**row._mapping)
 
 
 # -----------------------
 # Audit logging endpoints
 # -----------------------
 @router.get("/audit-logs", response_model=List[AuditLogEntry])
-async def get_audit_logs(
+def get_audit_logs(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     action: Optional[str] = Query(None),
     resource_type: Optional[str] = Query(None),
     user_id: Optional[int] = Query(None),
+    before_ts: Optional[datetime] = Query(None),
+    before_id: Optional[int] = Query(None),
+    include_total: bool = Query(False),
     current_user: User = Depends(require_admin),
     db: Session = Depends(get_db),
 ):
-    """Get audit logs (admin only)."""
+    """Get audit logs (admin only), newest first.
+
+    Page with the last entry's ``created_at``/``id`` as ``before_ts``/``before_id``.
+    With ``include_total`` the unpaginated count is sent as ``X-Total-Count``.
+    """
     query = db.query(models.AuditLog)
 
     # Apply filters
@@ -207,71 +329,90 @@ async def get_audit_logs(
     if user_id:
         query = query.filter(models.AuditLog.user_id == user_id)
 
+    total = count_ids(query, models.AuditLog.id) if include_total else None
+
     # Get logs with user information
     logs = (
-        query.order_by(models.AuditLog.created_at.desc())
+        newest_first(
+            query, models.AuditLog.timestamp, models.AuditLog.id, before_ts, before_id
+        )
         .offset(skip)
         .limit(limit)
-        .all()
+        .yield_per(STREAM_BATCH_SIZE)
     )
 
     user_service = UserService(db)
 
-    result = []
-    for log in logs:
-        username = None
-        if log.user_id:
-            user = user_service.get_user_by_id(log.user_id)
-            username = user.username if user else "Unknown"
-
-        result.append(
-            AuditLogEntry(
-                id=log.id,
-                user_id=log.user_id,
-                username=username,
-                action=log.action,
-                resource_type=log.resource_type,
-                resource_id=log.resource_id,
-                details=log.details,
-                ip_address=log.ip_address,
-                created_at=log.created_at.isoformat(),
+    # Usernames are resolved once per fetched batch with a single IN query.
+    def entries() -> Iterator[dict]:
+        for batch in iter_batches(logs, STREAM_BATCH_SIZE):
+            usernames = user_service.get_usernames_by_ids(
+                log.user_id for log in batch if log.user_id
             )
-        )
-
-    return result
+            for log in batch:
+                yield {
+                    "id": log.id,
+                    "user_id": log.user_id,
+                    "username": (
+                        usernames.get(log.user_id, "Unknown") if log.user_id else None
+                    ),
+                    "action": log.action,
+                    "resource_type": log.resource_type,
+                    "resource_id": log.resource_id,
+                    "details": log.details,
+                    "ip_address": log.ip_address,
+                    "created_at": log.timestamp,
+                }
+
+    response = stream_json_array(entries(), lambda entry: entry, db)
+    if total is not None:
+        response.headers["X-Total-Count"] = str(total)
+    return response
 
 
 @router.post("/audit-logs")
-async def create_audit_log(
+def create_audit_log(
+    response: Response,
     action: str,
     resource_type: str,
     resource_id: Optional[str] = None,
     details: Optional[dict] = None,
+    sync: bool = Query(False),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    """Create an audit log entry."""
-    # Instantiate the ORM model
-    audit_log = models.AuditLog(
-        user_id=current_user.get("user_id"),
-        action=action,
-        resource_type=resource_type,
-        resource_id=resource_id,
-        details=details,
-    )
-
-    db.add(audit_log)
+    """Create an audit log entry.
+
+    By default the entry is queued for the next bulk flush and 202 is
+    returned without an id; pass ``sync=true`` to insert it immediately.
+    Without a running flusher the entry is always inserted immediately.
+    """
+    values = {
+        "user_id": current_user.id,
+        "action": action,
+        "resource_type": resource_type,
+        "resource_id": resource_id,
+        "details": details,
+    }
+    if not sync and audit_log_buffer.running:
+        audit_log_buffer.add(values)
+        response.status_code = 202
+        return {"message": "Audit log queued"}
+
+    # INSERT ... RETURNING hands back the new id without a follow-up SELECT
+    audit_log_id = db.execute(
+        insert(models.AuditLog).values(**values).returning(models.AuditLog.id)
+    ).scalar_one()
     db.commit()
-    db.refresh(audit_log)
 
-    return {"message": "Audit log created successfully", "id": audit_log.id}
+    return {"message": "Audit log created successfully", "id": audit_log_id}
 
 
 # -----------------------
 # System metrics endpoints
 # -----------------------
 @router.get("/metrics", response_model=List[MetricEntry])
-async def get_system_metrics(
+def get_system_metrics(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     metric_name: Optional[str] = Query(None),
@@ -279,39 +420,19 @@ async def get_system_metrics(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    """Get system metrics."""
-    query = db.query(models.SystemMetrics)
-
-    # Filter by time range
-    time_threshold = datetime.utcnow() - timedelta(hours=hours)
-    query = query.filter(models.SystemMetrics.created_at >= time_threshold)
-
-    # Filter by metric name if provided
-    if metric_name:
-        query = query.filter(models.SystemMetrics.metric_name == metric_name)
-
-    metrics = (
-        query.order_by(models.SystemMetrics.created_at.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
+    """Get system metrics.
+
+    Not available: this tree has no ``SystemMetrics`` model or table to read
+    metrics from.
+    """
+    raise HTTPException(
+        status_code=status.HTTP_501_NOT_IMPLEMENTED,
+        detail="System metrics storage is not available",
     )
 
-    return [
-        MetricEntry(
-            id=metric.id,
-            metric_name=metric.metric_name,
-            metric_value=metric.metric_value,
-            metric_unit=metric.metric_unit,
-            tags=metric.tags,
-            created_at=metric.created_at.isoformat(),
-        )
-        for metric in metrics
-    ]
-
 
 @router.post("/metrics")
-async def record_metric(
+def record_metric(
     metric_name: str,
     metric_value: float,
     metric_unit: Optional[str] = None,
@@ -319,26 +440,30 @@ async def record_metric(
     current_user: User = Depends(require_admin),
     db: Session = Depends(get_db),
 ):
-    """Record a system metric."""
-    metric = models.SystemMetrics(
-        metric_name=metric_name,
-        metric_value=metric_value,
-        metric_unit=metric_unit,
-        tags=tags,
+    """Record a system metric.
+
+    Not available: this tree has no ``SystemMetrics`` model or table to store
+    metrics in.
+    """
+    raise HTTPException(
+        status_code=status.HTTP_501_NOT_IMPLEMENTED,
+        detail="System metrics storage is not available",
     )
 
-    db.add(metric)
-    db.commit()
-    db.refresh(metric)
-
-    return {"message": "Metric recorded successfully", "id": metric.id}
-
 
 # -----------------------
 # Performance analytics
 # -----------------------
+def _day_str(value: Any) -> str:
+    """Render a day bucket as ``YYYY-MM-DD`` whatever type the backend returns."""
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    return str(value)
+
+
 @router.get("/analytics/predictions")
-async def get_prediction_analytics(
+def get_prediction_analytics(
+    request: Request,
     days: int = Query(7, ge=1, le=90),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
@@ -346,69 +471,60 @@ async def get_prediction_analytics(
     """Get prediction analytics over time."""
     time_threshold = datetime.utcnow() - timedelta(days=days)
 
-    # Daily prediction counts
-    daily_counts = (
+    # One GROUP BY yields all three per-day aggregates; AVG skips NULLs, so
+    # days without confidence/execution data come back as None and are dropped.
+    day = day_bucket(models.Prediction.created_at)
+    daily = (
         db.query(
-            func.date(models.Prediction.created_at).label("date"),
+            day.label("date"),
             func.count(models.Prediction.id).label("count"),
-        )
-        .filter(models.Prediction.created_at >= time_threshold)
-        .group_by(func.date(models.Prediction.created_at))
-        .all()
-    )
-
-    # Average confidence by day
-    daily_confidence = (
-        db.query(
-            func.date(models.Prediction.created_at).label("date"),
             func.avg(models.Prediction.confidence_score).label("avg_confidence"),
-        )
-        .filter(
-            models.Prediction.created_at >= time_threshold,
-            models.Prediction.confidence_score.isnot(None),
-        )
-        .group_by(func.date(models.Prediction.created_at))
-        .all()
-    )
-
-    # Average execution time by day
-    daily_execution_time = (
-        db.query(
-            func.date(models.Prediction.created_at).label("date"),
             func.avg(models.Prediction.execution_time_ms).label("avg_execution_time"),
         )
-        .filter(
-            models.Prediction.created_at >= time_threshold,
-            models.Prediction.execution_time_ms.isnot(None),
-        )
-        .group_by(func.date(models.Prediction.created_at))
+        .filter(models.Prediction.created_at >= time_threshold)
+        .group_by(day)
         .all()
     )
 
-    return {
+    analytics = {
         "daily_prediction_counts": [
-            {"date": str(row.date), "count": row.count} for row in daily_counts
+            {"date": _day_str(row.date), "count": row.count} for row in daily
         ],
         "daily_avg_confidence": [
-            {"date": str(row.date), "avg_confidence": float(row.avg_confidence)}
-            for row in daily_confidence
+            {
+                "date": _day_str(row.date),
+                "avg_confidence": float(row.avg_confidence),
+            }
+            for row in daily
+            if row.avg_confidence is not None
         ],
         "daily_avg_execution_time": [
             {
-                "date": str(row.date),
+                "date": _day_str(row.date),
                 "avg_execution_time_ms": float(row.avg_execution_time),
             }
-            for row in daily_execution_time
+            for row in daily
+            if row.avg_execution_time is not None
         ],
     }
+    return etag_response(request, orjson.dumps(analytics), _ANALYTICS_CACHE_CONTROL)
 
 
 @router.get("/analytics/models")
-async def get_model_analytics(
+def get_model_analytics(
+    request: Request,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Get model usage analytics."""
+    # The encoded body is what gets cached, so hits skip serialization too.
+    body = _cached_aggregate(
+        "analytics_models", lambda: orjson.dumps(_compute_model_analytics(db))
+    )
+    return etag_response(request, body, _ANALYTICS_CACHE_CONTROL)
+
+
+def _compute_model_analytics(db: Session) -> Dict[str, Any]:
     # Model type distribution
     model_types = (
         db.query(models.Model.model_type, func.count(models.Model.id).label("count"))
@@ -425,17 +541,29 @@ async def get_model_analytics(
         .all()
     )
 
-    # Most used models (by prediction count)
+    # Most used models (by prediction count). The count is a correlated
+    # subquery per active model, answered by a range scan of the
+    # predictions (model_id, ...) index, instead of joining and grouping
+    # every prediction row; EXISTS keeps models without predictions out.
+    prediction_count = (
+        select(func.count(models.Prediction.id))
+        .where(models.Prediction.model_id == models.Model.id)
+        .correlate(models.Model)
+        .scalar_subquery()
+    )
+    has_predictions = (
+        select(models.Prediction.id)
+        .where(models.Prediction.model_id == models.Model.id)
+        .exists()
+    )
     popular_models = (
         db.query(
             models.Model.id,
             models.Model.name,
-            func.count(models.Prediction.id).label("prediction_count"),
+            prediction_count.label("prediction_count"),
         )
-        .join(models.Prediction, models.Model.id == models.Prediction.model_id)
-        .filter(models.Model.is_active.is_(True))
-        .group_by(models.Model.id, models.Model.name)
-        .order_by(func.count(models.Prediction.id).desc())
+        .filter(models.Model.is_active.is_(True), has_predictions)
+        .order_by(prediction_count.desc())
         .limit(10)
         .all()
     )
@@ -462,32 +590,32 @@ async def get_model_analytics(
 # System maintenance endpoints
 # -----------------------
 @router.post("/maintenance/cleanup")
-async def cleanup_system(
+def cleanup_system(
     days_old: int = Query(30, ge=7, le=365),
     current_user: User = Depends(require_admin),
     db: Session = Depends(get_db),
 ):
-    """Clean up old system data."""
-    cutoff_date = datetime.utcnow() - timedelta(days=days_old)
+    """Clean up old system data.
 
-    # Delete old audit logs and return number deleted
-    audit_deleted = (
-        db.query(models.AuditLog)
-        .filter(models.AuditLog.created_at < cutoff_date)
-        .delete(synchronize_session=False)
-    )
+    Audit logs are purged with a single DELETE whose rowcount is reported, so
+    nothing is counted up front. The age filter uses the ``audit_logs
+    (timestamp, id)`` index to delete by index range rather than scanning the
+    table.
+    """
+    cutoff_date = datetime.utcnow() - timedelta(days=days_old)
 
-    # Delete old system metrics and return number deleted
-    metrics_deleted = (
-        db.query(models.SystemMetrics)
-        .filter(models.SystemMetrics.created_at < cutoff_date)
-        .delete(synchronize_session=False)
-    )
+    # A plain DELETE skips the ORM's session bookkeeping entirely and reports
+    # via rowcount.
+    audit_deleted = db.execute(
+        text("DELETE FROM audit_logs WHERE timestamp < :cutoff"),
+        {"cutoff": cutoff_date},
+    ).rowcount
 
     db.commit()
 
     return {
         "message": "System cleanup completed",
         "audit_logs_deleted": audit_deleted,
-        "metrics_deleted": metrics_deleted,
+        # There is no system_metrics table (or model) to purge.
+        "metrics_deleted": 0,
     }
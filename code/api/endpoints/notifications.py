@@ -2,12 +2,14 @@
 Notification endpoints for Quantis API
 """
 
+from datetime import datetime
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from ..config import get_settings
-from ..database import get_db
+from ..database import count_ids, get_db
 from ..models import Notification, User
 from ..schemas import NotificationResponse
 from .auth import get_current_user
@@ -17,27 +19,38 @@ settings = get_settings()
 
 
 @router.get("/", response_model=List[NotificationResponse])
-async def get_notifications(
+def get_notifications(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     is_read: Optional[bool] = None,
+    include_total: bool = Query(False),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    """Get user's notifications"""
+    """Get user's notifications.
+
+    With ``include_total`` the unpaginated count is sent as ``X-Total-Count``.
+    """
     query = db.query(Notification).filter(Notification.user_id == current_user.id)
 
     if is_read is not None:
         query = query.filter(Notification.is_read == is_read)
 
-    notifications = (
-        query.order_by(Notification.created_at.desc()).offset(skip).limit(limit).all()
-    )
-    return notifications
+    page = query.order_by(Notification.created_at.desc()).offset(skip).limit(limit)
+    if not include_total:
+        return page.all()
+
+    # The window count rides along with the page, saving a second round trip;
+    # it is only unavailable when the page is empty.
+    rows = page.add_columns(func.count().over().label("total")).all()
+    total = rows[0].total if rows else count_ids(query, Notification.id)
+    response.headers["X-Total-Count"] = str(total)
+    return [row.Notification for row in rows]
 
 
 @router.get("/{notification_id}", response_model=NotificationResponse)
-async def get_notification(
+def get_notification(
     notification_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
@@ -58,7 +71,7 @@ async def get_notification(
 
 
 @router.patch("/{notification_id}/read")
-async def mark_notification_read(
+def mark_notification_read(
     notification_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
@@ -75,8 +88,6 @@ async def mark_notification_read(
     if not notification:
         raise HTTPException(status_code=404, detail="Notification not found")
 
-    from datetime import datetime
-
     notification.is_read = True
     notification.read_at = datetime.utcnow()
     db.commit()
@@ -86,17 +97,19 @@ async def mark_notification_read(
 
 
 @router.post("/mark-all-read")
-async def mark_all_notifications_read(
+def mark_all_notifications_read(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Mark all notifications as read"""
-    from datetime import datetime
-
     updated_count = (
         db.query(Notification)
         .filter(Notification.user_id == current_user.id, Notification.is_read == False)
-        .update({"is_read": True, "read_at": datetime.utcnow()})
+        .update(
+            {"is_read": True, "read_at": datetime.utcnow()},
+            # Nothing in this session holds these rows; skip the sync lookup.
+            synchronize_session=False,
+        )
     )
 
     db.commit()
@@ -108,7 +121,7 @@ async def mark_all_notifications_read(
 
 
 @router.delete("/{notification_id}")
-async def delete_notification(
+def delete_notification(
     notification_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
@@ -2,9 +2,13 @@
 Prediction endpoints with database integration
 """
 
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Iterable, Iterator, List, Optional
 
+import numpy as np
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
@@ -24,15 +28,34 @@ from ..middleware.auth import (
     admin_required,
 )
 
+from ..responses import STREAM_BATCH_SIZE, iter_batches, stream_json_array
+
 # ✅ FIXED — correct imports for schemas
 from ..schemas import PredictionCreate, PredictionResponse
 
 # ✅ FIXED — correct imports for services
-from ..services.prediction_service import PredictionService
+from ..services.prediction_service import PredictionService, _PredictionCache
 from ..services.model_service import ModelService
 
 router = APIRouter()
 
+# Fixed input for single-model health probes, built once at import.
+_HEALTH_PROBE = np.random.default_rng(0).random((1, 10)).astype(np.float32)
+_HEALTH_PROBE.flags.writeable = False
+
+# Probe outcomes per (model_id, trained_at), reused by repeated health checks.
+# Bounded, so keys left behind by retrained or deleted models age out.
+_HEALTH_RESULT_TTL_SECONDS = 5
+_HEALTH_RESULT_CACHE_SIZE = 1024
+_health_results = _PredictionCache(
+    _HEALTH_RESULT_CACHE_SIZE, _HEALTH_RESULT_TTL_SECONDS
+)
+
+# Bounds how many model artifacts /models/health deserializes at once.
+_HEALTH_CHECK_EXECUTOR = ThreadPoolExecutor(
+    max_workers=8, thread_name_prefix="model-health"
+)
+
 
 # Pydantic models
 class BatchPredictionCreate(BaseModel):
@@ -58,6 +81,11 @@ class PredictionHistory(BaseModel):
     created_at: str
 
 
+class ModelHealthResponse(BaseModel):
+    status: str
+    version: str
+
+
 class PredictionStats(BaseModel):
     total_predictions: int
     avg_confidence: float
@@ -66,9 +94,40 @@ class PredictionStats(BaseModel):
     predictions_by_day: dict
 
 
+def _stream_prediction_history(
+    predictions: Iterable[Any], db: Session
+) -> StreamingResponse:
+    """Stream predictions in the ``PredictionHistory`` shape.
+
+    Model names are resolved once per fetched batch with a single IN query.
+    """
+    model_service = ModelService(db)
+
+    def entries() -> Iterator[dict]:
+        for batch in iter_batches(predictions, STREAM_BATCH_SIZE):
+            model_names = model_service.get_model_names_by_ids(
+                pred.model_id for pred in batch
+            )
+            for pred in batch:
+                yield {
+                    "id": pred.id,
+                    "model_id": pred.model_id,
+                    "model_name": model_names.get(
+                        pred.model_id, f"Model {pred.model_id}"
+                    ),
+                    "input_data": pred.input_data,
+                    "prediction_result": pred.prediction_result,
+                    "confidence_score": pred.confidence_score,
+                    "execution_time_ms": pred.execution_time_ms,
+                    "created_at": pred.created_at,
+                }
+
+    return stream_json_array(entries(), lambda entry: entry, db)
+
+
 # Prediction endpoints
 @router.post("/predict", response_model=PredictionResponse)
-async def predict(
+def predict(
     request: PredictionCreate,
     current_user: dict = Depends(user_or_admin_required),
     _: dict = Depends(prediction_rate_limit),
@@ -99,7 +158,7 @@ async def predict(
 
 
 @router.post("/predict/{model_id}", response_model=PredictionResponse)
-async def predict_with_model(
+def predict_with_model(
     model_id: int,
     features: List[float],
     current_user: dict = Depends(user_or_admin_required),
@@ -128,7 +187,7 @@ async def predict_with_model(
 
 
 @router.post("/predict/batch", response_model=BatchPredictionResponse)
-async def batch_predict(
+def batch_predict(
     request: BatchPredictionCreate,
     current_user: dict = Depends(user_or_admin_required),
     db: Session = Depends(get_db),
@@ -172,50 +231,36 @@ async def batch_predict(
 
 
 @router.get("/predictions/history", response_model=List[PredictionHistory])
-async def get_prediction_history(
+def get_prediction_history(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     model_id: Optional[int] = Query(None),
+    before_ts: Optional[datetime] = Query(None),
+    before_id: Optional[int] = Query(None),
+    include_total: bool = Query(False),
     current_user: dict = Depends(validate_api_key),
     db: Session = Depends(get_db),
 ):
-    """Get prediction history for the current user."""
-    prediction_service = PredictionService(db)
-    model_service = ModelService(db)
-
-    if model_id:
-        predictions = prediction_service.get_predictions_by_model(model_id, skip, limit)
-    else:
-        predictions = prediction_service.get_predictions_by_user(
-            current_user["user_id"], skip, limit
-        )
+    """Get prediction history for the current user, newest first.
 
-    # Cache model names
-    model_names = {}
-    for pred in predictions:
-        if pred.model_id not in model_names:
-            model = model_service.get_model_by_id(pred.model_id)
-            model_names[pred.model_id] = (
-                model.name if model else f"Model {pred.model_id}"
-            )
+    Page with the last entry's ``created_at``/``id`` as ``before_ts``/``before_id``.
+    With ``include_total`` the unpaginated count is sent as ``X-Total-Count``.
+    """
+    prediction_service = PredictionService(db)
 
-    return [
-        PredictionHistory(
-            id=pred.id,
-            model_id=pred.model_id,
-            model_name=model_names[pred.model_id],
-            input_data=pred.input_data,
-            prediction_result=pred.prediction_result,
-            confidence_score=pred.confidence_score,
-            execution_time_ms=pred.execution_time_ms,
-            created_at=pred.created_at.isoformat(),
-        )
-        for pred in predictions
-    ]
+    user_id = None if model_id else current_user["user_id"]
+    predictions = prediction_service.stream_predictions(
+        user_id, model_id, skip, limit, before_ts, before_id, STREAM_BATCH_SIZE
+    )
+    response = _stream_prediction_history(predictions, db)
+    if include_total:
+        total = prediction_service.count_predictions(user_id, model_id)
+        response.headers["X-Total-Count"] = str(total)
+    return response
 
 
 @router.get("/predictions/stats", response_model=PredictionStats)
-async def get_prediction_statistics(
+def get_prediction_statistics(
     model_id: Optional[int] = Query(None),
     current_user: dict = Depends(validate_api_key),
     db: Session = Depends(get_db),
@@ -233,7 +278,7 @@ async def get_prediction_statistics(
 
 
 @router.get("/predictions/{prediction_id}")
-async def get_prediction(
+def get_prediction(
     prediction_id: int,
     current_user: dict = Depends(validate_api_key),
     db: Session = Depends(get_db),
@@ -253,72 +298,115 @@ async def get_prediction(
     ):
         raise HTTPException(status_code=403, detail="Access denied")
 
-    model = model_service.get_model_by_id(prediction.model_id)
+    model_names = model_service.get_model_names_by_ids([prediction.model_id])
 
     return {
         "id": prediction.id,
         "model_id": prediction.model_id,
-        "model_name": model.name if model else f"Model {prediction.model_id}",
+        "model_name": model_names.get(
+            prediction.model_id, f"Model {prediction.model_id}"
+        ),
         "input_data": prediction.input_data,
         "prediction_result": prediction.prediction_result,
         "confidence_score": prediction.confidence_score,
         "execution_time_ms": prediction.execution_time_ms,
-        "created_at": prediction.created_at.isoformat(),
+        "created_at": prediction.created_at,
         "user_id": prediction.user_id,
     }
 
 
 # Model health endpoints
+def _model_or_404(model_service: ModelService, model_id: int) -> Any:
+    """Return the model row, raising 404 if it does not exist."""
+    model = model_service.get_model_by_id(model_id)
+    if not model:
+        raise HTTPException(status_code=404, detail="Model not found")
+    return model
+
+
 @router.get("/models/{model_id}/health")
-async def check_model_health(
+def check_model_health(
     model_id: int,
     current_user: dict = Depends(readonly_or_above),
     db: Session = Depends(get_db),
 ):
-    """Check health status of a specific model."""
-    try:
-        model_service = ModelService(db)
-        model = model_service.get_model_by_id(model_id)
+    """Cheap liveness check: is the model trained and its artifact loadable?
 
-        if not model:
-            raise HTTPException(status_code=404, detail="Model not found")
+    Artifact loads are memoized, so this does no inference and, after the
+    first call, no disk I/O. Use ``/health/deep`` to exercise the model.
+    """
+    model_service = ModelService(db)
+    model = _model_or_404(model_service, model_id)
 
-        if model.status != "trained":
-            return ModelHealthResponse(status="unhealthy", version="N/A")
+    if model.status != "trained":
+        return ModelHealthResponse(status="unhealthy", version="N/A")
+    if model_service.load_model_file(model.id, model.file_path, model.trained_at):
+        return ModelHealthResponse(status="healthy", version=f"v{model.id}")
+    return ModelHealthResponse(status="unhealthy", version="N/A")
 
-        trained_model = model_service.load_trained_model(model_id)
-        if not trained_model:
-            return ModelHealthResponse(status="unhealthy", version="N/A")
 
-        # Run a simple test input
-        import numpy as np
+@router.get("/models/{model_id}/health/deep")
+def check_model_health_deep(
+    model_id: int,
+    current_user: dict = Depends(readonly_or_above),
+    _: dict = Depends(prediction_rate_limit),
+    db: Session = Depends(get_db),
+):
+    """Readiness check that runs a forward pass on a fixed probe input.
 
-        test = np.random.rand(10).tolist()
-        trained_model.predict([test])
+    Probe outcomes are reused for a few seconds, so frequent readiness
+    checks do not run the model every time.
+    """
+    model_service = ModelService(db)
+    model = _model_or_404(model_service, model_id)
 
-        return ModelHealthResponse(status="healthy", version=f"v{model.id}")
+    if model.status != "trained":
+        return ModelHealthResponse(status="unhealthy", version="N/A")
 
-    except Exception:
+    key = (model.id, model.trained_at)
+    healthy = _health_results.get(key)
+    if healthy is None:
+        try:
+            trained_model = model_service.load_model_file(
+                model.id, model.file_path, model.trained_at
+            )
+            # Run a simple test input
+            healthy = trained_model is not None
+            if healthy:
+                trained_model.predict(_HEALTH_PROBE)
+        except Exception:
+            healthy = False
+        _health_results.put(key, healthy)
+
+    if not healthy:
         return ModelHealthResponse(status="unhealthy", version="N/A")
+    return ModelHealthResponse(status="healthy", version=f"v{model.id}")
 
 
 @router.get("/models/health", response_model=List[dict])
-async def check_all_models_health(
+def check_all_models_health(
     current_user: dict = Depends(readonly_or_above), db: Session = Depends(get_db)
 ):
     """Check health of all models."""
     model_service = ModelService(db)
     all_models = model_service.get_all_models()
 
+    # Artifact loads are independent disk reads, so they run concurrently;
+    # only plain values cross into the worker threads, never the session.
+    loads = {
+        model.id: _HEALTH_CHECK_EXECUTOR.submit(
+            ModelService.load_model_file, model.id, model.file_path, model.trained_at
+        )
+        for model in all_models
+        if model.status == "trained" and model.file_path
+    }
+
     health = []
     for model in all_models:
+        load = loads.get(model.id)
         try:
-            if model.status != "trained":
-                status = "unhealthy"
-            else:
-                trained_model = model_service.load_trained_model(model.id)
-                status = "healthy" if trained_model else "unhealthy"
-        except:
+            status = "healthy" if load and load.result() else "unhealthy"
+        except Exception:
             status = "unhealthy"
 
         health.append(
@@ -327,9 +415,7 @@ async def check_all_models_health(
                 "model_name": model.name,
                 "status": status,
                 "model_status": model.status,
-                "last_trained": (
-                    model.trained_at.isoformat() if model.trained_at else None
-                ),
+                "last_trained": model.trained_at,
             }
         )
 
@@ -337,36 +423,17 @@ async def check_all_models_health(
 
 
 @router.get("/admin/predictions", response_model=List[PredictionHistory])
-async def get_all_predictions(
+def get_all_predictions(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    before_ts: Optional[datetime] = Query(None),
+    before_id: Optional[int] = Query(None),
     current_user: dict = Depends(admin_required),
     db: Session = Depends(get_db),
 ):
-    """Admin endpoint: Get all predictions."""
+    """Admin endpoint: Get all predictions, newest first (keyset-pageable)."""
     prediction_service = PredictionService(db)
-    model_service = ModelService(db)
-
-    predictions = prediction_service.get_all_predictions(skip, limit)
-
-    model_names = {}
-    for pred in predictions:
-        if pred.model_id not in model_names:
-            model = model_service.get_model_by_id(pred.model_id)
-            model_names[pred.model_id] = (
-                model.name if model else f"Model {pred.model_id}"
-            )
-
-    return [
-        PredictionHistory(
-            id=pred.id,
-            model_id=pred.model_id,
-            model_name=model_names[pred.model_id],
-            input_data=pred.input_data,
-            prediction_result=pred.prediction_result,
-            confidence_score=pred.confidence_score,
-            execution_time_ms=pred.execution_time_ms,
-            created_at=pred.created_at.isoformat(),
-        )
-        for pred in predictions
-    ]
+    predictions = prediction_service.stream_predictions(
+        None, None, skip, limit, before_ts, before_id, STREAM_BATCH_SIZE
+    )
+    return _stream_prediction_history(predictions, db)
@@ -3,16 +3,18 @@ User management endpoints for Quantis API
 """
 
 import logging
-from typing import List
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
 
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import bindparam, delete, exists, func, insert, select, update
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload, selectinload
 
 from ..auth import AuditLogger, get_current_user, require_permission
 from ..config import Settings, get_settings
 from ..database import DataMaskingManager, get_data_masking_manager, get_db
-from ..models import Permission, Role, User
+from ..models import Permission, Role, User, role_permission_association
 from ..schemas import (
     PermissionCreate,
     PermissionResponse,
@@ -28,23 +30,124 @@ settings: Settings = get_settings()
 router = APIRouter()
 
 
+# The ``_user_row`` fields as selectable columns, for listings that skip the ORM.
+_USER_ROW_COLUMNS = (
+    User.id,
+    User.uuid,
+    User.username,
+    User.email,
+    User.first_name,
+    User.last_name,
+    User.phone_number,
+    User.timezone,
+    User.role_id,
+    Role.role_name.label("role"),
+    User.is_active,
+    User.is_verified,
+    User.is_mfa_enabled,
+    User.last_login,
+    User.created_at,
+    User.updated_at,
+)
+
+
+# Built once: the by-id lookup only varies in its user_id parameter.
+_LIVE_USER_WITH_ROLE = (
+    select(User)
+    .options(joinedload(User.role))
+    .where(User.id == bindparam("user_id"), User.is_deleted == False)
+)
+
+
+def _user_row(user: User) -> Dict[str, Any]:
+    """Plain ``UserResponse``-shaped dict for ``user``.
+
+    FastAPI validates it once against ``response_model``; building a
+    ``UserResponse`` here as well would validate every user twice.
+    """
+    return {
+        "id": user.id,
+        "uuid": user.uuid,
+        "username": user.username,
+        "email": user.email,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "phone_number": user.phone_number,
+        "timezone": user.timezone,
+        "role_id": user.role_id,
+        "role": user.role.role_name if user.role else None,
+        "is_active": user.is_active,
+        "is_verified": user.is_verified,
+        "is_mfa_enabled": user.is_mfa_enabled,
+        "last_login": user.last_login,
+        "created_at": user.created_at,
+        "updated_at": user.updated_at,
+    }
+
+
+def _checked_permission_ids(
+    db: Session, permission_ids: Optional[List[int]]
+) -> Set[int]:
+    """Deduplicated ``permission_ids``, or 400 if any of them does not exist.
+
+    Validation is a single ``COUNT`` over the ids; no permission rows are loaded.
+    """
+    ids = set(permission_ids or ())
+    if ids:
+        found = db.scalar(
+            select(func.count(Permission.id)).where(Permission.id.in_(ids))
+        )
+        if found != len(ids):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="One or more permission IDs are invalid.",
+            )
+    return ids
+
+
+def _link_permissions(db: Session, role_id: int, permission_ids: Set[int]) -> None:
+    """Associate ``permission_ids`` with the role in one bulk INSERT."""
+    if permission_ids:
+        db.execute(
+            insert(role_permission_association),
+            [{"role_id": role_id, "permission_id": pid} for pid in permission_ids],
+        )
+
+
 # User Endpoints
 @router.get("/", response_model=List[UserResponse])
 @require_permission("read_users")
-async def get_all_users(
+def get_all_users(
     request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    include_total: bool = Query(False),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
     data_masking_manager: DataMaskingManager = Depends(get_data_masking_manager),
 ):
-    """Retrieve all users (admin/privileged access only)"""
-    users = db.query(User).filter(User.is_deleted == False).all()
+    """Retrieve a page of users, ordered by ID (admin/privileged access only).
+
+    With ``include_total`` the unpaginated count is sent as ``X-Total-Count``.
+    """
+    if include_total:
+        total = db.scalar(select(func.count(User.id)).where(User.is_deleted == False))
+        response.headers["X-Total-Count"] = str(total)
+
+    # Column rows straight into dicts: no ORM identity map, no role lazy
+    # loads, and response_model validates each entry once.
+    rows = db.execute(
+        select(*_USER_ROW_COLUMNS)
+        .outerjoin(Role, User.role_id == Role.id)
+        .where(User.is_deleted == False)
+        .order_by(User.id)
+        .offset(skip)
+        .limit(limit)
+    ).mappings()
 
     # Apply data masking if enabled
-    masked_users = []
-    for user in users:
-        user_dict = UserResponse.from_orm(user).dict()
-        masked_users.append(data_masking_manager.mask_object(user_dict))
+    masked_users = [data_masking_manager.mask_object(dict(row)) for row in rows]
 
     AuditLogger.log_event(
         db=db,
@@ -59,7 +162,7 @@ async def get_all_users(
 
 @router.get("/{user_id}", response_model=UserResponse)
 @require_permission("read_user")
-async def get_user_by_id(
+def get_user_by_id(
     user_id: int,
     request: Request,
     db: Session = Depends(get_db),
@@ -67,7 +170,7 @@ async def get_user_by_id(
     data_masking_manager: DataMaskingManager = Depends(get_data_masking_manager),
 ):
     """Retrieve a user by ID (admin/privileged access or self)"""
-    user = db.query(User).filter(User.id == user_id, User.is_deleted == False).first()
+    user = db.scalar(_LIVE_USER_WITH_ROLE, {"user_id": user_id})
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
@@ -75,15 +178,14 @@ async def get_user_by_id(
 
     # Ensure user can only access their own data unless they have admin/read_users permission
     if not (
-        current_user.id == user_id or require_permission("read_all_users")(current_user)
+        current_user.id == user_id or "read_all_users" in current_user.permission_set
     ):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to access this user's data",
         )
 
-    user_dict = UserResponse.from_orm(user).dict()
-    masked_user = data_masking_manager.mask_object(user_dict)
+    masked_user = data_masking_manager.mask_object(_user_row(user))
 
     AuditLogger.log_event(
         db=db,
@@ -99,7 +201,7 @@ async def get_user_by_id(
 
 @router.put("/{user_id}", response_model=UserResponse)
 @require_permission("update_user")
-async def update_user(
+def update_user(
     user_id: int,
     user_update: UserUpdate,
     request: Request,
@@ -107,28 +209,44 @@ async def update_user(
     current_user: User = Depends(get_current_user),
 ):
     """Update a user's information (admin/privileged access or self)"""
-    user = db.query(User).filter(User.id == user_id, User.is_deleted == False).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
-        )
-
+    live_user = (User.id == user_id, User.is_deleted == False)
     # Ensure user can only update their own data unless they have admin/update_users permission
     if not (
-        current_user.id == user_id
-        or require_permission("update_all_users")(current_user)
+        current_user.id == user_id or "update_all_users" in current_user.permission_set
     ):
+        # A missing user is still reported as 404 ahead of the 403.
+        if not db.scalar(select(exists().where(*live_user))):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
+            )
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to update this user's data",
         )
 
     update_data = user_update.dict(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(user, key, value)
+    if update_data:
+        # UPDATE ... RETURNING applies the change and hands back the row in
+        # one round trip; populate_existing refreshes an already-loaded user.
+        user = db.scalar(
+            update(User)
+            .where(*live_user)
+            .values(**update_data)
+            .returning(User)
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )
+    else:
+        user = db.scalar(select(User).where(*live_user))
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
+        )
 
+    # Roles are usually already in the identity map, so this rarely queries.
+    db.get(Role, user.role_id)
+    # Snapshot before the commit expires the instance.
+    user_row = _user_row(user)
     db.commit()
-    db.refresh(user)
 
     AuditLogger.log_event(
         db=db,
@@ -136,37 +254,43 @@ async def update_user(
         action="update_user",
         resource_type="user",
         resource_id=str(user_id),
-        resource_name=user.username,
+        resource_name=user_row["username"],
         request=request,
     )
-    return UserResponse.from_orm(user)
+    return user_row
 
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 @require_permission("delete_user")
-async def delete_user(
+def delete_user(
     user_id: int,
     request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     """Soft delete a user (admin/privileged access only)"""
-    user = db.query(User).filter(User.id == user_id, User.is_deleted == False).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
-        )
-
     # Prevent self-deletion for admin users
-    if current_user.id == user_id and require_permission("admin")(current_user):
+    if current_user.id == user_id and "admin" in current_user.permission_set:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin users cannot delete their own account.",
         )
 
-    user.is_deleted = True
-    user.deleted_at = datetime.utcnow()
-    user.deleted_by_id = current_user.id
+    username = db.scalar(
+        update(User)
+        .where(User.id == user_id, User.is_deleted == False)
+        .values(
+            is_deleted=True,
+            deleted_at=datetime.utcnow(),
+            deleted_by_id=current_user.id,
+        )
+        .returning(User.username)
+        .execution_options(synchronize_session=False)
+    )
+    if username is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
+        )
     db.commit()
 
     AuditLogger.log_event(
@@ -175,7 +299,7 @@ async def delete_user(
         action="delete_user",
         resource_type="user",
         resource_id=str(user_id),
-        resource_name=user.username,
+        resource_name=username,
         request=request,
     )
     return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -184,7 +308,7 @@ async def delete_user(
 # Role Endpoints
 @router.post("/roles", response_model=RoleResponse, status_code=status.HTTP_201_CREATED)
 @require_permission("create_role")
-async def create_role(
+def create_role(
     role_data: RoleCreate,
     request: Request,
     db: Session = Depends(get_db),
@@ -202,24 +326,15 @@ async def create_role(
                 detail="Role name already exists.",
             )
 
-        # Validate permissions
-        permissions = (
-            db.query(Permission)
-            .filter(Permission.id.in_(role_data.permission_ids))
-            .all()
-        )
-        if len(permissions) != len(role_data.permission_ids):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="One or more permission IDs are invalid.",
-            )
+        permission_ids = _checked_permission_ids(db, role_data.permission_ids)
 
         new_role = Role(
             role_name=role_data.role_name,
             description=role_data.description,
-            permissions=permissions,
         )
         db.add(new_role)
+        db.flush()
+        _link_permissions(db, new_role.id, permission_ids)
         db.commit()
         db.refresh(new_role)
 
@@ -232,7 +347,7 @@ async def create_role(
             resource_name=new_role.role_name,
             request=request,
         )
-        return RoleResponse.from_orm(new_role)
+        return new_role
     except IntegrityError:
         db.rollback()
         raise HTTPException(
@@ -251,13 +366,22 @@ async def create_role(
 
 @router.get("/roles", response_model=List[RoleResponse])
 @require_permission("read_roles")
-async def get_all_roles(
+def get_all_roles(
     request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Retrieve all roles"""
-    roles = db.query(Role).all()
+    """Retrieve a page of roles, ordered by ID"""
+    roles = (
+        db.query(Role)
+        .options(selectinload(Role.permissions))
+        .order_by(Role.id)
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
     AuditLogger.log_event(
         db=db,
         user_id=current_user.id,
@@ -266,12 +390,12 @@ async def get_all_roles(
         resource_name="all_roles",
         request=request,
     )
-    return [RoleResponse.from_orm(role) for role in roles]
+    return roles
 
 
 @router.put("/roles/{role_id}", response_model=RoleResponse)
 @require_permission("update_role")
-async def update_role(
+def update_role(
     role_id: int,
     role_update: RoleCreate,
     request: Request,
@@ -279,32 +403,36 @@ async def update_role(
     current_user: User = Depends(get_current_user),
 ):
     """Update an existing role"""
-    role = db.query(Role).filter(Role.id == role_id).first()
+    update_data = role_update.dict(exclude_unset=True)
+    relink = "permission_ids" in update_data
+    permission_ids = update_data.pop("permission_ids", None)
+    # role_name is required, so there is always something to UPDATE; RETURNING
+    # doubles as the existence check.
+    role = db.scalar(
+        update(Role)
+        .where(Role.id == role_id)
+        .values(**update_data)
+        .returning(Role)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
     if not role:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Role not found."
         )
 
-    update_data = role_update.dict(exclude_unset=True)
-    if "permission_ids" in update_data:
-        permissions = (
-            db.query(Permission)
-            .filter(Permission.id.in_(update_data["permission_ids"]))
-            .all()
-        )
-        if len(permissions) != len(update_data["permission_ids"]):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="One or more permission IDs are invalid.",
+    if relink:
+        permission_ids = _checked_permission_ids(db, permission_ids)
+        # Replace the links in the association table directly; the role's
+        # permissions collection is reloaded after the commit.
+        db.execute(
+            delete(role_permission_association).where(
+                role_permission_association.c.role_id == role_id
             )
-        role.permissions = permissions
-        del update_data["permission_ids"]
-
-    for key, value in update_data.items():
-        setattr(role, key, value)
+        )
+        _link_permissions(db, role_id, permission_ids)
 
+    role_name = role.role_name
     db.commit()
-    db.refresh(role)
 
     AuditLogger.log_event(
         db=db,
@@ -312,29 +440,31 @@ async def update_role(
         action="update_role",
         resource_type="role",
         resource_id=str(role_id),
-        resource_name=role.role_name,
+        resource_name=role_name,
         request=request,
     )
-    return RoleResponse.from_orm(role)
+    # The commit expired the role; serializing it reloads the row and the
+    # relinked permissions in this still-open session.
+    return role
 
 
 @router.delete("/roles/{role_id}", status_code=status.HTTP_204_NO_CONTENT)
 @require_permission("delete_role")
-async def delete_role(
+def delete_role(
     role_id: int,
     request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     """Delete a role"""
-    role = db.query(Role).filter(Role.id == role_id).first()
+    role = db.get(Role, role_id)
     if not role:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Role not found."
         )
 
     # Prevent deletion of roles that have associated users
-    if db.query(User).filter(User.role_id == role_id).first():
+    if db.scalar(select(exists().where(User.role_id == role_id))):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Cannot delete role: users are assigned to this role.",
@@ -362,7 +492,7 @@ async def delete_role(
     status_code=status.HTTP_201_CREATED,
 )
 @require_permission("create_permission")
-async def create_permission(
+def create_permission(
     permission_data: PermissionCreate,
     request: Request,
     db: Session = Depends(get_db),
@@ -387,7 +517,7 @@ async def create_permission(
             resource_name=new_permission.permission_name,
             request=request,
         )
-        return PermissionResponse.from_orm(new_permission)
+        return new_permission
     except IntegrityError:
         db.rollback()
         raise HTTPException(
@@ -404,13 +534,17 @@ async def create_permission(
 
 @router.get("/permissions", response_model=List[PermissionResponse])
 @require_permission("read_permissions")
-async def get_all_permissions(
+def get_all_permissions(
     request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Retrieve all permissions"""
-    permissions = db.query(Permission).all()
+    """Retrieve a page of permissions, ordered by ID"""
+    permissions = (
+        db.query(Permission).order_by(Permission.id).offset(skip).limit(limit).all()
+    )
     AuditLogger.log_event(
         db=db,
         user_id=current_user.id,
@@ -419,26 +553,31 @@ async def get_all_permissions(
         resource_name="all_permissions",
         request=request,
     )
-    return [PermissionResponse.from_orm(permission) for permission in permissions]
+    return permissions
 
 
 @router.delete("/permissions/{permission_id}", status_code=status.HTTP_204_NO_CONTENT)
 @require_permission("delete_permission")
-async def delete_permission(
+def delete_permission(
     permission_id: int,
     request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     """Delete a permission"""
-    permission = db.query(Permission).filter(Permission.id == permission_id).first()
+    permission = db.get(Permission, permission_id)
     if not permission:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Permission not found."
         )
 
-    # Prevent deletion of permissions that are assigned to roles
-    if permission.roles:
+    # Prevent deletion of permissions that are assigned to roles; EXISTS on the
+    # association table rather than loading the whole roles collection.
+    if db.scalar(
+        select(
+            exists().where(role_permission_association.c.permission_id == permission_id)
+        )
+    ):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Cannot delete permission: it is assigned to one or more roles.",
@@ -2,10 +2,12 @@
 WebSocket endpoints for Quantis API
 """
 
-from typing import Dict
+import asyncio
+from collections import defaultdict
+from typing import Any, DefaultDict, List, Set, Tuple
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-import json
 import logging
+import orjson
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -13,31 +15,69 @@ logger = logging.getLogger(__name__)
 
 # Simple WebSocket connection manager
 class ConnectionManager:
+    """Tracks every open socket per user, so each browser tab gets updates."""
+
     def __init__(self):
-        self.active_connections: Dict[int, WebSocket] = {}
+        self.active_connections: DefaultDict[int, Set[WebSocket]] = defaultdict(set)
 
     async def connect(self, websocket: WebSocket, user_id: int):
         await websocket.accept()
-        self.active_connections[user_id] = websocket
+        self.active_connections[user_id].add(websocket)
         logger.info(f"WebSocket connected: user_id={user_id}")
 
-    def disconnect(self, user_id: int):
-        if user_id in self.active_connections:
+    def disconnect(self, user_id: int, websocket: WebSocket):
+        connections = self.active_connections.get(user_id)
+        if connections is None or websocket not in connections:
+            return
+        connections.discard(websocket)
+        if not connections:
             del self.active_connections[user_id]
-            logger.info(f"WebSocket disconnected: user_id={user_id}")
+        logger.info(f"WebSocket disconnected: user_id={user_id}")
 
     async def send_personal_message(self, message: str, user_id: int):
-        if user_id in self.active_connections:
-            await self.active_connections[user_id].send_text(message)
+        connections = [
+            (user_id, connection)
+            for connection in self.active_connections.get(user_id, ())
+        ]
+        await self._send_all(connections, message)
 
     async def broadcast(self, message: str):
-        for connection in self.active_connections.values():
-            await connection.send_text(message)
+        connections = [
+            (user_id, connection)
+            for user_id, user_connections in self.active_connections.items()
+            for connection in user_connections
+        ]
+        await self._send_all(connections, message)
+
+    async def _send_all(self, connections: List[Tuple[int, WebSocket]], message: str):
+        # Send to every socket concurrently, so one slow client doesn't hold up
+        # the rest; working from a snapshot keeps concurrent connects and
+        # disconnects safe. Sockets whose send fails are closed and dropped.
+        results = await asyncio.gather(
+            *(connection.send_text(message) for _, connection in connections),
+            return_exceptions=True,
+        )
+        for (user_id, connection), result in zip(connections, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Send to user_id={user_id} failed: {result}")
+                self.disconnect(user_id, connection)
+                try:
+                    await connection.close()
+                except Exception:
+                    pass
 
 
 manager = ConnectionManager()
 
 
+def _dumps(obj: Any) -> str:
+    # orjson encodes in C; replies stay text frames for existing clients.
+    return orjson.dumps(obj).decode()
+
+
+_INVALID_JSON_RESPONSE = _dumps({"status": "error", "message": "Invalid JSON format"})
+
+
 @router.websocket("/updates/{user_id}")
 async def websocket_endpoint(websocket: WebSocket, user_id: int):
     """
@@ -51,8 +91,10 @@ async def websocket_endpoint(websocket: WebSocket, user_id: int):
 
             # Parse and handle the message
             try:
-                message = json.loads(data)
-                logger.info(f"Received message from user {user_id}: {message}")
+                message = orjson.loads(data)
+                # Runs per frame: %-style defers formatting the payload until a
+                # handler actually emits the record.
+                logger.info("Received message from user %s: %s", user_id, message)
 
                 # Echo back a response
                 response = {
@@ -60,15 +102,13 @@ async def websocket_endpoint(websocket: WebSocket, user_id: int):
                     "message": "Message received successfully",
                     "data": message,
                 }
-                await websocket.send_text(json.dumps(response))
-            except json.JSONDecodeError:
-                await websocket.send_text(
-                    json.dumps({"status": "error", "message": "Invalid JSON format"})
-                )
+                await websocket.send_text(_dumps(response))
+            except orjson.JSONDecodeError:
+                await websocket.send_text(_INVALID_JSON_RESPONSE)
 
     except WebSocketDisconnect:
-        manager.disconnect(user_id)
+        manager.disconnect(user_id, websocket)
         logger.info(f"User {user_id} disconnected")
     except Exception as e:
         logger.error(f"WebSocket error for user {user_id}: {str(e)}")
-        manager.disconnect(user_id)
+        manager.disconnect(user_id, websocket)
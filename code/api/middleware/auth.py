@@ -2,23 +2,43 @@
 Authentication middleware with database integration
 """
 
+import hashlib
+import logging
 import os
+import threading
 import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
-from jose import jwt
+from typing import Dict, Iterator, List, Optional, Any, Tuple
+import redis
+from jose import JWTError, jwt
 from fastapi import Depends, Header, HTTPException, Security
 from fastapi.security import APIKeyHeader, OAuth2PasswordBearer
 from sqlalchemy.orm import Session
+from ..config import get_settings
 from ..database import SessionLocal, get_db
 from ..services.user_service import UserService
 
+logger = logging.getLogger(__name__)
 API_KEY_HEADER = APIKeyHeader(name="X-API-Key")
 JWT_SECRET = os.getenv(
     "JWT_SECRET", "your-secret-key-should-be-in-env-change-this-in-production"
 )
 JWT_ALGORITHM = "HS256"
+_JWT_DECODE_ALGORITHMS = [JWT_ALGORITHM]
 JWT_EXPIRATION_MINUTES = 30
+# Verified token payloads, keyed by a truncated SHA-256 of the token. Entries
+# never outlive the token's ``exp``, and decoding consults nothing else, so
+# the cache cannot accept a token that ``jwt.decode`` would reject.
+JWT_CACHE_TTL_SECONDS = 60
+_JWT_CACHE_SIZE = 10_000
+_jwt_cache: Dict[bytes, Tuple[float, dict]] = {}
+# User info resolved by ``validate_jwt_token``, under the same keys. A user
+# deactivated or changed in the meantime keeps their old info for up to this
+# long, the same staleness API key validation already accepts.
+JWT_USER_CACHE_TTL_SECONDS = 30
+_jwt_user_cache: Dict[bytes, Tuple[float, dict]] = {}
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 
@@ -40,16 +60,40 @@ def create_jwt_token(data: dict, expires_delta: Optional[timedelta] = None) -> A
     return encoded_jwt
 
 
+def _token_key(token: str) -> bytes:
+    # Tokens are never kept in memory in the clear.
+    return hashlib.sha256(token.encode()).digest()[:16]
+
+
 def decode_jwt_token(token: str) -> Any:
-    """Decode and validate JWT token."""
+    """Decode and validate JWT token.
+
+    Verified payloads are cached for ``JWT_CACHE_TTL_SECONDS`` (never past
+    their ``exp``), so a token replayed across a burst of requests is only
+    verified once. Failures are never cached.
+    """
+    if token.count(".") != 2:
+        # Not a compact JWS; skip hashing, the cache and signature checks.
+        return None
+    key = _token_key(token)
+    now = time.monotonic()
+    entry = _jwt_cache.get(key)
+    if entry is not None and entry[0] > now:
+        return dict(entry[1])
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        return payload
-    except jwt.PyJWTError:
+        payload = jwt.decode(token, JWT_SECRET, algorithms=_JWT_DECODE_ALGORITHMS)
+    except JWTError:
         return None
+    expires = now + JWT_CACHE_TTL_SECONDS
+    if isinstance(payload.get("exp"), (int, float)):
+        expires = min(expires, now + payload["exp"] - time.time())
+    if len(_jwt_cache) >= _JWT_CACHE_SIZE:
+        _jwt_cache.clear()
+    _jwt_cache[key] = (expires, payload)
+    return dict(payload)
 
 
-async def validate_api_key(
+def validate_api_key(
     api_key: str = Security(API_KEY_HEADER), db: Session = Depends(get_db)
 ):
     """Validate API key and return user info."""
@@ -68,10 +112,19 @@ async def validate_api_key(
         raise HTTPException(status_code=500, detail=f"Authentication error: {str(e)}")
 
 
-async def validate_jwt_token(
+def validate_jwt_token(
     token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
 ):
-    """Validate JWT token and return user info."""
+    """Validate JWT token and return user info.
+
+    The result is cached per token for ``JWT_USER_CACHE_TTL_SECONDS`` (never
+    past the token's ``exp``), so repeat requests skip the user lookup.
+    """
+    key = _token_key(token)
+    now = time.monotonic()
+    entry = _jwt_user_cache.get(key)
+    if entry is not None and entry[0] > now:
+        return dict(entry[1])
     payload = decode_jwt_token(token)
     if payload is None:
         raise HTTPException(
@@ -87,15 +140,22 @@ async def validate_jwt_token(
             detail="User not found or inactive",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return {
+    user_info = {
         "user_id": user.id,
         "username": user.username,
         "email": user.email,
-        "role": user.role,
+        "role": user.role.role_name if user.role else None,
     }
+    expires = now + JWT_USER_CACHE_TTL_SECONDS
+    if isinstance(payload.get("exp"), (int, float)):
+        expires = min(expires, now + payload["exp"] - time.time())
+    if len(_jwt_user_cache) >= _JWT_CACHE_SIZE:
+        _jwt_user_cache.clear()
+    _jwt_user_cache[key] = (expires, user_info)
+    return dict(user_info)
 
 
-async def optional_auth(
+def optional_auth(
     api_key: Optional[str] = Header(None, alias="X-API-Key"),
     db: Session = Depends(get_db),
 ):
@@ -103,134 +163,308 @@ async def optional_auth(
     if not api_key:
         return None
     try:
-        return await validate_api_key(api_key, db)
+        return validate_api_key(api_key, db)
     except HTTPException:
         return None
 
 
 class RoleChecker:
-
     def __init__(self, required_roles: List[str]) -> None:
         self.required_roles = required_roles
+        # Precomputed once per checker instead of on every request.
+        self._allowed = frozenset(required_roles)
+        self._detail = (
+            f"Insufficient permissions. Required roles: {', '.join(required_roles)}"
+        )
 
     def __call__(self, user: dict = Depends(validate_api_key)) -> Any:
-        if user.get("role") not in self.required_roles:
-            raise HTTPException(
-                status_code=403,
-                detail=f"Insufficient permissions. Required roles: {', '.join(self.required_roles)}",
-            )
+        if user.get("role") not in self._allowed:
+            raise HTTPException(status_code=403, detail=self._detail)
         return user
 
 
-class RateLimiter:
+# Rate-limit counters live in Redis when it is configured, so limits hold
+# across worker processes. Short timeouts keep an unhealthy Redis from adding
+# latency: after an error the limiters use their in-process state and leave
+# Redis alone for ``_RATE_LIMIT_REDIS_BACKOFF_SECONDS``.
+_RATE_LIMIT_WINDOW_SECONDS = 60
+# Hard cap on keys each in-process limiter tracks. Past it the least recently
+# seen key is evicted, so a flood of distinct users or addresses costs bounded
+# memory; the evicted keys are the coldest, whose state is closest to fresh.
+RATE_LIMIT_MAX_KEYS = 100_000
+_RATE_LIMIT_REDIS_BACKOFF_SECONDS = 5.0
+_rate_limit_redis: Optional[redis.Redis] = None
+_rate_limit_redis_retry_at = 0.0
+# Counts a hit and, on the window's first hit, sets its expiry, atomically and
+# in one round trip; no key can be left behind without a TTL.
+_WINDOW_HIT_SCRIPT = """
+local hits = redis.call('INCR', KEYS[1])
+if hits == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+return hits
+"""
+_window_hit: Optional[Any] = None
+
+
+def _shared_window_hits(key: str) -> Optional[int]:
+    """Count a hit in ``key``'s current one-minute window in Redis.
+
+    Returns the window's hit count including this one (a fixed-window
+    counter, see ``_WINDOW_HIT_SCRIPT``), or ``None`` when Redis is not
+    configured or unreachable.
+    """
+    global _rate_limit_redis, _rate_limit_redis_retry_at, _window_hit
+    if time.monotonic() < _rate_limit_redis_retry_at:
+        return None
+    if _window_hit is None:
+        redis_url = get_settings().redis_url
+        if not redis_url:
+            return None
+        _rate_limit_redis = redis.Redis.from_url(
+            redis_url, socket_connect_timeout=0.25, socket_timeout=0.25
+        )
+        # Sent by EVALSHA, falling back to loading the script if Redis lacks it.
+        _window_hit = _rate_limit_redis.register_script(_WINDOW_HIT_SCRIPT)
+    window = int(time.time()) // _RATE_LIMIT_WINDOW_SECONDS
+    bucket = f"rl:{key}:{window}"
+    try:
+        hits = int(_window_hit(keys=[bucket], args=[_RATE_LIMIT_WINDOW_SECONDS]))
+    except redis.RedisError as e:
+        _rate_limit_redis_retry_at = (
+            time.monotonic() + _RATE_LIMIT_REDIS_BACKOFF_SECONDS
+        )
+        logger.warning(f"Rate limit backend unavailable, using local state: {e}")
+        return None
+    return hits
+
+
+class _LimiterShard:
+    """One lock-guarded slice of an in-process limiter's per-key state."""
+
+    __slots__ = ("lock", "entries", "next_sweep")
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.entries: "OrderedDict[Any, List[float]]" = OrderedDict()
+        self.next_sweep = time.monotonic() + 60
+
+
+# Keys are spread over this many shards (a power of two), each with its own
+# lock, so concurrent checks for different keys rarely contend. Every shard
+# holds an equal share of ``RATE_LIMIT_MAX_KEYS``.
+_RATE_LIMIT_SHARDS = 16
+_SHARD_MAX_KEYS = RATE_LIMIT_MAX_KEYS // _RATE_LIMIT_SHARDS
+
+
+class _ShardedLimiter:
+    def __init__(self) -> None:
+        self._shards = [_LimiterShard() for _ in range(_RATE_LIMIT_SHARDS)]
 
-    def __init__(self, requests_per_minute: int = 60) -> None:
+    def _shard(self, key: Any) -> _LimiterShard:
+        return self._shards[hash(key) & (_RATE_LIMIT_SHARDS - 1)]
+
+    @staticmethod
+    def _entry(shard: _LimiterShard, key: Any) -> Optional[List[float]]:
+        """``key``'s state marked most recently used, or None if untracked.
+
+        Also makes room for a new key, evicting the shard's least recently
+        used one once it is full. Call with ``shard.lock`` held.
+        """
+        entry = shard.entries.get(key)
+        if entry is not None:
+            shard.entries.move_to_end(key)
+        elif len(shard.entries) >= _SHARD_MAX_KEYS:
+            shard.entries.popitem(last=False)
+        return entry
+
+
+class RateLimiter(_ShardedLimiter):
+    """Per-user request limit, shared across workers through Redis.
+
+    With Redis configured each user gets a fixed one-minute window counter
+    (see ``_shared_window_hits``). Without it, or while it is unreachable,
+    each process keeps a per-user token bucket refilled at
+    ``requests_per_minute`` / 60 per second: one ``[tokens, last_refill]``
+    pair per user, so a check is O(1) and uses the monotonic clock. Buckets
+    idle for a minute are swept, and at most ``RATE_LIMIT_MAX_KEYS`` are kept.
+    """
+
+    def __init__(self, requests_per_minute: int = 60, name: str = "user") -> None:
+        super().__init__()
         self.requests_per_minute = requests_per_minute
-        self.request_history = {}
+        # Namespaces this limiter's Redis counters.
+        self.name = name
 
     def __call__(self, user: dict = Depends(validate_api_key)) -> Any:
         user_id = user.get("user_id", "anonymous")
-        if user_id not in self.request_history:
-            self.request_history[user_id] = []
-        current_time = time.time()
-        minute_ago = current_time - 60
-        self.request_history[user_id] = [
-            timestamp
-            for timestamp in self.request_history[user_id]
-            if timestamp > minute_ago
-        ]
-        limit = (
+        capacity = (
             self.requests_per_minute * 2
             if user.get("role") == Roles.ADMIN
             else self.requests_per_minute
         )
-        if len(self.request_history[user_id]) >= limit:
+        hits = _shared_window_hits(f"{self.name}:{user_id}")
+        if hits is not None:
+            allowed = hits <= capacity
+        else:
+            allowed = self._take_token(user_id, capacity)
+        if not allowed:
             raise HTTPException(
                 status_code=429, detail="Rate limit exceeded. Try again later."
             )
-        self.request_history[user_id].append(current_time)
         return user
 
-
-class IPRateLimiter:
-
-    def __init__(self, requests_per_minute: int = 30) -> None:
+    def _take_token(self, user_id: Any, capacity: int) -> bool:
+        now = time.monotonic()
+        shard = self._shard(user_id)
+        with shard.lock:
+            if now >= shard.next_sweep:
+                # A bucket untouched for a minute has refilled completely, so
+                # dropping it is indistinguishable from keeping it.
+                idle = [k for k, b in shard.entries.items() if now - b[1] >= 60]
+                for k in idle:
+                    del shard.entries[k]
+                shard.next_sweep = now + 60
+            bucket = self._entry(shard, user_id)
+            if bucket is None:
+                bucket = shard.entries[user_id] = [float(capacity), now]
+            tokens = min(capacity, bucket[0] + (now - bucket[1]) * capacity / 60.0)
+            bucket[1] = now
+            if tokens < 1:
+                bucket[0] = tokens
+                return False
+            bucket[0] = tokens - 1
+            return True
+
+
+class IPRateLimiter(_ShardedLimiter):
+    """Per-IP one-minute limit, shared across workers through Redis.
+
+    Without Redis each address keeps a sliding-window counter: the counts for
+    the current and previous fixed minute, with the previous one weighted by
+    how much of it still overlaps the trailing minute. That is three numbers
+    per address whatever the traffic, and O(1) per check, while avoiding the
+    double burst a plain fixed window allows at its boundary. Addresses idle
+    for a full window are swept every minute, and at most
+    ``RATE_LIMIT_MAX_KEYS`` are kept.
+    """
+
+    def __init__(self, requests_per_minute: int = 30, name: str = "ip") -> None:
+        super().__init__()
         self.requests_per_minute = requests_per_minute
-        self.request_history = {}
+        self.name = name
 
     def __call__(self, request: Any) -> Any:
         client_ip = request.client.host
-        if client_ip not in self.request_history:
-            self.request_history[client_ip] = []
-        current_time = time.time()
-        minute_ago = current_time - 60
-        self.request_history[client_ip] = [
-            timestamp
-            for timestamp in self.request_history[client_ip]
-            if timestamp > minute_ago
-        ]
-        if len(self.request_history[client_ip]) >= self.requests_per_minute:
+        hits = _shared_window_hits(f"{self.name}:{client_ip}")
+        if hits is not None:
+            allowed = hits <= self.requests_per_minute
+        else:
+            allowed = self._record(client_ip)
+        if not allowed:
             raise HTTPException(
                 status_code=429, detail="Rate limit exceeded. Try again later."
             )
-        self.request_history[client_ip].append(current_time)
         return True
 
+    def _record(self, client_ip: str) -> bool:
+        now = time.monotonic()
+        window, elapsed = divmod(now, 60)
+        shard = self._shard(client_ip)
+        with shard.lock:
+            if now >= shard.next_sweep:
+                # Anything older than the previous window no longer counts.
+                idle = [
+                    ip for ip, state in shard.entries.items() if state[0] < window - 1
+                ]
+                for ip in idle:
+                    del shard.entries[ip]
+                shard.next_sweep = now + 60
+            # [window, previous_count, count]
+            state = self._entry(shard, client_ip)
+            if state is None:
+                state = shard.entries[client_ip] = [window, 0, 0]
+            elif state[0] < window - 1:
+                state[:] = [window, 0, 0]
+            elif state[0] == window - 1:
+                state[:] = [window, state[2], 0]
+            estimate = state[1] * (1 - elapsed / 60) + state[2]
+            if estimate >= self.requests_per_minute:
+                return False
+            state[2] += 1
+            return True
+
 
 admin_required = RoleChecker([Roles.ADMIN])
 user_or_admin_required = RoleChecker([Roles.USER, Roles.ADMIN])
 readonly_or_above = RoleChecker([Roles.READONLY, Roles.USER, Roles.ADMIN])
-standard_rate_limit = RateLimiter(60)
-prediction_rate_limit = RateLimiter(30)
-public_rate_limit = IPRateLimiter(30)
+standard_rate_limit = RateLimiter(60, name="standard")
+prediction_rate_limit = RateLimiter(30, name="prediction")
+public_rate_limit = IPRateLimiter(30, name="public")
+
+
+@contextmanager
+def _scoped_session(db: Optional[Session]) -> Iterator[Session]:
+    """Yield ``db`` when the caller has one, else a short-lived session.
+
+    A session opened here is committed on success and rolled back on error;
+    a caller-supplied session is left for its owner to finish.
+    """
+    if db is not None:
+        yield db
+        return
+    db = SessionLocal()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
 
 
 class ApiKeyManager:
-    """Legacy compatibility class - now uses database backend"""
+    """Legacy compatibility class - now uses database backend.
+
+    Each method takes an optional ``db``; callers that already hold a request
+    session (``Depends(get_db)``) should pass it to skip a pool checkout.
+    """
 
     @staticmethod
     def create_api_key(
-        user_id: str, role: str = Roles.USER, expiry_days: int = 30
+        user_id: str,
+        role: str = Roles.USER,
+        expiry_days: int = 30,
+        db: Optional[Session] = None,
     ) -> str:
         """Create a new API key - legacy compatibility method"""
-        db = SessionLocal()
-        try:
+        with _scoped_session(db) as db:
             user_service = UserService(db)
             if isinstance(user_id, str) and user_id.isdigit():
                 user_id = int(user_id)
             return user_service.create_api_key(user_id, f"Legacy Key", expiry_days)
-        finally:
-            db.close()
 
     @staticmethod
-    def validate_api_key(api_key: str) -> Dict:
+    def validate_api_key(api_key: str, db: Optional[Session] = None) -> Dict:
         """Validate API key - legacy compatibility method"""
-        db = SessionLocal()
-        try:
+        with _scoped_session(db) as db:
             user_service = UserService(db)
             return user_service.validate_api_key(api_key)
-        finally:
-            db.close()
 
     @staticmethod
-    def revoke_api_key(api_key: str) -> bool:
+    def revoke_api_key(api_key: str, db: Optional[Session] = None) -> bool:
         """Revoke an API key - legacy compatibility method"""
-        db = SessionLocal()
-        try:
+        with _scoped_session(db) as db:
             user_service = UserService(db)
             return user_service.revoke_api_key(api_key)
-        finally:
-            db.close()
 
     @staticmethod
-    def get_user_keys(user_id: str) -> List[str]:
+    def get_user_keys(user_id: str, db: Optional[Session] = None) -> List[str]:
         """Get all API keys for a user - legacy compatibility method"""
-        db = SessionLocal()
-        try:
+        with _scoped_session(db) as db:
             user_service = UserService(db)
             if isinstance(user_id, str) and user_id.isdigit():
                 user_id = int(user_id)
             api_keys = user_service.get_user_api_keys(user_id)
             return [f"key_{key.id}" for key in api_keys]
-        finally:
-            db.close()
@@ -2,10 +2,13 @@
 CORS middleware for handling cross-origin requests
 """
 
-from typing import List, Optional, Any
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
 from fastapi import Request
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.middleware.cors import CORSMiddleware as StarletteCORSMiddleware
 
 
 class CORSMiddleware(BaseHTTPMiddleware):
@@ -52,6 +55,18 @@ class CORSMiddleware(BaseHTTPMiddleware):
         ]
         self.max_age = max_age
         self.allow_origin_regex = allow_origin_regex
+        # Header values don't change after construction; format them once.
+        self._methods_str = ", ".join(self.allow_methods)
+        self._headers_str = ", ".join(self.allow_headers)
+        self._expose_str = ", ".join(self.expose_headers)
+        self._max_age_str = str(self.max_age)
+        # Origin checks run per request: hash lookups and a compiled pattern.
+        self._allow_any_origin = "*" in self.allow_origins
+        self._allow_origins_set = frozenset(self.allow_origins)
+        self._origin_re = re.compile(allow_origin_regex) if allow_origin_regex else None
+        # The CORS headers depend only on the request origin, so build each
+        # origin's set once and copy it onto responses afterwards.
+        self._cors_headers = lru_cache(maxsize=512)(self._build_cors_headers)
 
     async def dispatch(self, request: Request, call_next):
         if request.method == "OPTIONS":
@@ -62,38 +77,33 @@ class CORSMiddleware(BaseHTTPMiddleware):
 
     def _create_preflight_response(self, request: Request) -> Any:
         """Create response for preflight OPTIONS requests"""
-        from fastapi.responses import Response
-
-        response = Response()
-        self._add_cors_headers(request, response)
-        return response
+        return Response(headers=self._cors_headers(request.headers.get("origin")))
 
     def _add_cors_headers(self, request: Request, response: Any) -> Any:
         """Add CORS headers to response"""
-        origin = request.headers.get("origin")
+        response.headers.update(self._cors_headers(request.headers.get("origin")))
+
+    def _build_cors_headers(self, origin: Optional[str]) -> Dict[str, str]:
+        """Build the CORS headers sent for the given origin"""
+        headers = {}
         if self._is_origin_allowed(origin):
-            response.headers["Access-Control-Allow-Origin"] = origin or "*"
+            headers["Access-Control-Allow-Origin"] = origin or "*"
         if self.allow_credentials:
-            response.headers["Access-Control-Allow-Credentials"] = "true"
-        response.headers["Access-Control-Allow-Methods"] = ", ".join(self.allow_methods)
-        response.headers["Access-Control-Allow-Headers"] = ", ".join(self.allow_headers)
-        response.headers["Access-Control-Expose-Headers"] = ", ".join(
-            self.expose_headers
-        )
-        response.headers["Access-Control-Max-Age"] = str(self.max_age)
+            headers["Access-Control-Allow-Credentials"] = "true"
+        headers["Access-Control-Allow-Methods"] = self._methods_str
+        headers["Access-Control-Allow-Headers"] = self._headers_str
+        headers["Access-Control-Expose-Headers"] = self._expose_str
+        headers["Access-Control-Max-Age"] = self._max_age_str
+        return headers
 
     def _is_origin_allowed(self, origin: Optional[str]) -> bool:
         """Check if the origin is allowed"""
         if not origin:
             return True
-        if "*" in self.allow_origins:
-            return True
-        if origin in self.allow_origins:
+        if self._allow_any_origin or origin in self._allow_origins_set:
             return True
-        if self.allow_origin_regex:
-            import re
-
-            return bool(re.match(self.allow_origin_regex, origin))
+        if self._origin_re is not None:
+            return self._origin_re.match(origin) is not None
         return False
 
 
@@ -117,8 +127,10 @@ def setup_cors(app: Any, environment: str = "development") -> Any:
     else:
         allowed_origins = ["*"]
         allow_credentials = False
+    # Starlette's CORS middleware is plain ASGI, so it skips the extra task
+    # and stream that every BaseHTTPMiddleware dispatch costs.
     app.add_middleware(
-        CORSMiddleware,
+        StarletteCORSMiddleware,
         allow_origins=allowed_origins,
         allow_credentials=allow_credentials,
         allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS"],
@@ -3,27 +3,71 @@ Error handling middleware for comprehensive error management
 """
 
 import logging
+import time
 import traceback
 from datetime import datetime
 from typing import Any, Dict, Optional
 
 from fastapi import HTTPException, Request
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Error payloads carry a second-resolution timestamp; format it once per second
+# instead of once per response.
+_timestamp_cache = (0, "")
 
-class ErrorHandlingMiddleware(BaseHTTPMiddleware):
-    """Middleware to handle all exceptions and provide consistent error responses"""
 
-    async def dispatch(self, request: Request, call_next):
+def _utc_timestamp() -> str:
+    global _timestamp_cache
+    second = int(time.time())
+    cached_second, cached = _timestamp_cache
+    if second != cached_second:
+        cached = datetime.utcfromtimestamp(second).isoformat()
+        _timestamp_cache = (second, cached)
+    return cached
+
+
+class ErrorHandlingMiddleware:
+    """Middleware to handle all exceptions and provide consistent error responses
+
+    Written as plain ASGI rather than ``BaseHTTPMiddleware`` so requests are
+    not routed through an extra task and memory stream.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        response_started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
         try:
-            response = await call_next(request)
-            return response
-        except HTTPException as exc:
+            await self.app(scope, receive, send_wrapper)
+            return
+        except Exception as exc:
+            # Once headers are on the wire there is no way to swap in an
+            # error body; let the server deal with the broken response.
+            if response_started:
+                raise
+            response = self._error_response(Request(scope), exc)
+        await response(scope, receive, send)
+
+    @staticmethod
+    def _error_response(request: Request, exc: Exception) -> JSONResponse:
+        if isinstance(exc, HTTPException):
             # Handle FastAPI HTTP exceptions
             return JSONResponse(
                 status_code=exc.status_code,
@@ -31,11 +75,11 @@ class ErrorHandlingMiddleware(BaseHTTPMiddleware):
                     "error": True,
                     "message": exc.detail,
                     "status_code": exc.status_code,
-                    "timestamp": datetime.utcnow().isoformat(),
+                    "timestamp": _utc_timestamp(),
                     "path": str(request.url),
                 },
             )
-        except ValueError as exc:
+        if isinstance(exc, ValueError):
             # Handle validation errors
             logger.error(f"Validation error: {str(exc)}")
             return JSONResponse(
@@ -44,26 +88,25 @@ class ErrorHandlingMiddleware(BaseHTTPMiddleware):
                     "error": True,
                     "message": f"Validation error: {str(exc)}",
                     "status_code": 400,
-                    "timestamp": datetime.utcnow().isoformat(),
+                    "timestamp": _utc_timestamp(),
                     "path": str(request.url),
                 },
             )
-        except Exception as exc:
-            # Handle all other exceptions
-            logger.error(f"Unhandled exception: {str(exc)}")
-            logger.error(traceback.format_exc())
-
-            return JSONResponse(
-                status_code=500,
-                content={
-                    "error": True,
-                    "message": "Internal server error",
-                    "status_code": 500,
-                    "timestamp": datetime.utcnow().isoformat(),
-                    "path": str(request.url),
-                    "details": str(exc) if logger.level <= logging.DEBUG else None,
-                },
-            )
+        # Handle all other exceptions
+        logger.error(f"Unhandled exception: {str(exc)}")
+        logger.error(traceback.format_exc())
+
+        return JSONResponse(
+            status_code=500,
+            content={
+                "error": True,
+                "message": "Internal server error",
+                "status_code": 500,
+                "timestamp": _utc_timestamp(),
+                "path": str(request.url),
+                "details": str(exc) if logger.level <= logging.DEBUG else None,
+            },
+        )
 
 
 def create_error_response(
@@ -74,7 +117,7 @@ def create_error_response(
         "error": True,
         "message": message,
         "status_code": status_code,
-        "timestamp": datetime.utcnow().isoformat(),
+        "timestamp": _utc_timestamp(),
     }
 
     if details:
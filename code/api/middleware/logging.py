@@ -3,9 +3,11 @@ Logging middleware for request/response tracking and monitoring
 """
 
 import logging
+import queue
 import time
 from datetime import datetime
-from typing import Any, Dict
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, List, Optional
 from fastapi import Request
 from starlette.middleware.base import BaseHTTPMiddleware
 
@@ -14,6 +16,38 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+_queue_listener: Optional[QueueListener] = None
+_direct_handlers: List[logging.Handler] = []
+
+
+def enable_queued_logging() -> None:
+    """Move the root handlers behind a queue drained by a background thread.
+
+    Request threads and the event loop then only enqueue records; the
+    blocking writes to stderr or files happen on the listener's thread.
+    """
+    global _queue_listener, _direct_handlers
+    if _queue_listener is not None:
+        return
+    root = logging.getLogger()
+    _direct_handlers = list(root.handlers) or [logging.StreamHandler()]
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    _queue_listener = QueueListener(
+        log_queue, *_direct_handlers, respect_handler_level=True
+    )
+    root.handlers = [QueueHandler(log_queue)]
+    _queue_listener.start()
+
+
+def disable_queued_logging() -> None:
+    """Flush queued records and restore the original root handlers."""
+    global _queue_listener
+    if _queue_listener is None:
+        return
+    _queue_listener.stop()
+    logging.getLogger().handlers = _direct_handlers
+    _queue_listener = None
+
 
 class LoggingMiddleware(BaseHTTPMiddleware):
     """Middleware to log all requests and responses"""
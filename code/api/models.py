@@ -7,7 +7,7 @@ import secrets
 import uuid
 from datetime import datetime, timedelta
 from enum import Enum as PyEnum
-from typing import Any
+from typing import Any, FrozenSet
 from passlib.context import CryptContext
 from sqlalchemy import (
     Numeric,
@@ -25,6 +25,7 @@ from sqlalchemy import (
     Text,
     UniqueConstraint,
     event,
+    text,
 )
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
@@ -214,6 +215,14 @@ class User(Base, AuditMixin, SoftDeleteMixin):
     __table_args__ = (
         Index("idx_user_email_active", "email", "is_active"),
         Index("idx_user_username_active", "username", "is_active"),
+        # Partial index over live users only: listings filter on
+        # is_deleted = false and page by id, which this serves directly.
+        Index(
+            "idx_user_live_id",
+            "id",
+            postgresql_where=text("is_deleted = false"),
+            sqlite_where=text("is_deleted = 0"),
+        ),
     )
 
     def verify_password(self, password: str) -> bool:
@@ -240,6 +249,22 @@ class User(Base, AuditMixin, SoftDeleteMixin):
             return f"{self.first_name} {self.last_name}"
         return self.username
 
+    @property
+    def permission_set(self) -> FrozenSet[str]:
+        """Names of the permissions granted by the user's role.
+
+        Built once per instance, so repeated checks within a request are set
+        lookups rather than walks over ``role.permissions``.
+        """
+        permissions = self.__dict__.get("_permission_set")
+        if permissions is None:
+            role = self.role
+            permissions = frozenset(
+                p.permission_name for p in (role.permissions if role else ())
+            )
+            self.__dict__["_permission_set"] = permissions
+        return permissions
+
 
 class UserSession(Base, AuditMixin):
     __tablename__ = "user_sessions"
@@ -363,7 +388,7 @@ class Model(Base, AuditMixin, SoftDeleteMixin):
     model_versions = relationship("Model", remote_side=[id])
     experiments = relationship("Experiment", back_populates="model")
     __table_args__ = (
-        Index("idx_model_owner_status", "owner_id", "status"),
+        Index("idx_model_owner_status_type", "owner_id", "status", "model_type"),
         Index("idx_model_type_status", "model_type", "status"),
         UniqueConstraint(
             "name", "version", "owner_id", name="uq_model_name_version_owner"
@@ -394,7 +419,17 @@ class Prediction(Base, AuditMixin):
     model = relationship("Model", back_populates="predictions")
     __table_args__ = (
         Index("idx_prediction_user_model", "user_id", "model_id"),
-        Index("idx_prediction_created_at", "created_at"),
+        Index("idx_prediction_user_created", "user_id", "created_at", "id"),
+        Index("idx_prediction_model_created", "model_id", "created_at", "id"),
+        # Serves the rolling-window analytics as an index-only range scan; the
+        # per-day grouping is computed from these entries. (An index on
+        # date(created_at) is not possible: the timestamptz cast is not
+        # IMMUTABLE in PostgreSQL.)
+        Index(
+            "idx_prediction_created_covering",
+            "created_at",
+            postgresql_include=["confidence_score", "execution_time_ms"],
+        ),
     )
 
 
@@ -435,7 +470,9 @@ class Notification(Base, AuditMixin):
     data = Column(JSON, default=dict)
     user = relationship("User", back_populates="notifications")
     __table_args__ = (
-        Index("idx_notification_user_read", "user_id", "is_read"),
+        # Serves the per-user inbox listing, with or without the is_read
+        # filter, in created_at order.
+        Index("idx_notification_user_read_created", "user_id", "is_read", "created_at"),
         Index("idx_notification_type_sent", "notification_type", "is_sent"),
     )
 
@@ -479,7 +516,7 @@ class AuditLog(Base):
     __table_args__ = (
         Index("idx_audit_log_user_id", "user_id"),
         Index("idx_audit_log_action", "action"),
-        Index("idx_audit_log_timestamp", "timestamp"),
+        Index("idx_audit_log_timestamp_id", "timestamp", "id"),
     )
 
 
@@ -0,0 +1,99 @@
+"""
+Response helpers for Quantis API
+"""
+
+import hashlib
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+
+import orjson
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy.orm import Session
+
+# Rows fetched per round trip when streaming list endpoints via ``yield_per``.
+STREAM_BATCH_SIZE = 200
+
+
+def iter_batches(rows: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Group ``rows`` into lists of up to ``size`` items.
+
+    Lets a streaming serializer resolve related rows (owners, datasets) with
+    one IN query per batch instead of one query per row.
+    """
+    batch: List[Any] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def stream_json_array(
+    rows: Iterable[Any],
+    serialize: Callable[[Any], dict],
+    db: Optional[Session] = None,
+) -> StreamingResponse:
+    """Stream ``rows`` as a JSON array, encoding one row at a time.
+
+    ``rows`` is normally a query using ``yield_per`` so the DB cursor is
+    consumed incrementally and peak memory does not grow with ``limit``.
+    When ``db`` is given it is closed once the stream is exhausted, because
+    the request-scoped session may be released before the body is sent.
+    """
+
+    def generate() -> Iterator[bytes]:
+        try:
+            yield b"["
+            separator = b""
+            for row in rows:
+                yield separator + orjson.dumps(serialize(row))
+                separator = b","
+            yield b"]"
+        finally:
+            if db is not None:
+                db.close()
+
+    return StreamingResponse(generate(), media_type="application/json")
+
+
+def json_response(content: Any, status_code: int = 200) -> Response:
+    """Encode ``content`` with orjson, bypassing response-model validation.
+
+    Use for payloads the handler builds itself from trusted ORM rows; the
+    route's ``response_model`` still documents the shape in OpenAPI.
+    """
+    return Response(
+        content=orjson.dumps(content),
+        status_code=status_code,
+        media_type="application/json",
+    )
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag for a response body."""
+    return '"%s"' % hashlib.md5(body, usedforsecurity=False).hexdigest()
+
+
+def etag_response(
+    request: Request,
+    body: bytes,
+    cache_control: str,
+    etag: Optional[str] = None,
+) -> Response:
+    """Serve JSON ``body`` with ``ETag``/``Cache-Control`` headers.
+
+    Answers ``304 Not Modified`` without a body when the client's
+    ``If-None-Match`` already names this representation. Pass ``etag`` when
+    it has been computed ahead of time for a static body.
+    """
+    etag = etag or make_etag(body)
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (
+        if_none_match.strip() == "*"
+        or etag in (tag.strip() for tag in if_none_match.split(","))
+    ):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
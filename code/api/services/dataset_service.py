@@ -2,8 +2,11 @@
 Dataset service for data management operations
 """
 
+import logging
 import os
-from typing import Any, Dict, List, Optional
+import tempfile
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
 import pandas as pd
 from sqlalchemy import and_
 from sqlalchemy.orm import Session
@@ -11,6 +14,7 @@ from .. import models
 from ..config import get_settings
 from ..database import EncryptionManager
 
+logger = logging.getLogger(__name__)
 settings = get_settings()
 
 
@@ -69,6 +73,18 @@ class DatasetService:
             .first()
         )
 
+    def get_dataset_names_by_ids(self, dataset_ids: Iterable[int]) -> Dict[int, str]:
+        """Map dataset IDs to names with a single IN query"""
+        ids = set(dataset_ids)
+        if not ids:
+            return {}
+        rows = (
+            self.db.query(models.Dataset.id, models.Dataset.name)
+            .filter(models.Dataset.id.in_(ids), models.Dataset.is_deleted == False)
+            .all()
+        )
+        return {row.id: row.name for row in rows}
+
     def get_datasets_by_owner(
         self, owner_id: int, skip: int = 0, limit: int = 100
     ) -> List[models.Dataset]:
@@ -4,9 +4,11 @@ Model service for machine learning model management
 
 import logging
 import os
+import tempfile
 import time
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 import joblib
 import numpy as np
 import pandas as pd
@@ -20,6 +22,46 @@ logger = logging.getLogger(__name__)
 settings = get_settings()
 
 
+_ARTIFACT_CACHE_SIZE = 64
+
+
+@lru_cache(maxsize=_ARTIFACT_CACHE_SIZE)
+def _load_artifact(
+    model_id: int, file_path: str, trained_at: Optional[datetime]
+) -> Any:
+    # Failures raise and are therefore not cached. Artifacts are written
+    # uncompressed by save_trained_model, so their numpy arrays are memory
+    # mapped read-only and their pages shared between worker processes.
+    return joblib.load(file_path, mmap_mode="r")
+
+
+def _dump_artifact(trained_model: Any, file_path: str) -> None:
+    # Loaded artifacts are memory mapped, possibly by other workers too, so
+    # the file must never be truncated in place: write a sibling temp file
+    # and swap it in. Existing mappings keep the old inode alive.
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(file_path) or ".", suffix=".tmp"
+    )
+    os.close(fd)
+    try:
+        joblib.dump(trained_model, tmp_path)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+# Model names change rarely and are looked up on every prediction listing,
+# so they are kept per process for a short TTL. Renames and deletes made
+# through this service evict the entry immediately.
+_MODEL_NAME_TTL_SECONDS = 300
+_model_name_cache: Dict[int, Tuple[float, str]] = {}
+
+
+def _forget_model_name(model_id: int) -> None:
+    _model_name_cache.pop(model_id, None)
+
+
 class ModelService:
 
     def __init__(self, db: Session) -> None:
@@ -66,36 +108,135 @@ class ModelService:
         return model
 
     def get_model_by_id(self, model_id: int) -> Optional[models.Model]:
+        model = self.db.get(models.Model, model_id)
+        return model if model is not None and not model.is_deleted else None
+
+    def get_models_by_ids(self, model_ids: Iterable[int]) -> List[models.Model]:
+        """Fetch several models with a single IN query."""
+        ids = set(model_ids)
+        if not ids:
+            return []
         return (
             self.db.query(models.Model)
-            .filter(and_(models.Model.id == model_id, models.Model.is_deleted == False))
-            .first()
+            .filter(models.Model.id.in_(ids), models.Model.is_deleted == False)
+            .all()
+        )
+
+    def get_model_names_by_ids(self, model_ids: Iterable[int]) -> Dict[int, str]:
+        """Map model IDs to names, querying only IDs missing from the cache."""
+        now = time.monotonic()
+        names: Dict[int, str] = {}
+        missing = set()
+        for model_id in set(model_ids):
+            entry = _model_name_cache.get(model_id)
+            if entry is not None and entry[0] > now:
+                names[model_id] = entry[1]
+            else:
+                missing.add(model_id)
+        if missing:
+            rows = (
+                self.db.query(models.Model.id, models.Model.name)
+                .filter(models.Model.id.in_(missing), models.Model.is_deleted == False)
+                .all()
+            )
+            expires = now + _MODEL_NAME_TTL_SECONDS
+            for row in rows:
+                _model_name_cache[row.id] = (expires, row.name)
+                names[row.id] = row.name
+        return names
+
+    def get_model_for_user(
+        self, model_id: int, user_id: int, is_admin: bool = False
+    ) -> Optional[models.Model]:
+        """Fetch a model only if ``user_id`` owns it (or ``is_admin`` is set).
+
+        Ownership is checked in the same query, so a missing model and a
+        model the user may not see both come back as None.
+        """
+        return self._model_for_user_query(
+            self.db.query(models.Model), model_id, user_id, is_admin
+        ).first()
+
+    def get_model_metrics_for_user(
+        self, model_id: int, user_id: int, is_admin: bool = False
+    ) -> Optional[Any]:
+        """Like get_model_for_user, but loads only the ``metrics`` column.
+
+        Returns a row with a ``metrics`` attribute, or None.
+        """
+        return self._model_for_user_query(
+            self.db.query(models.Model.metrics), model_id, user_id, is_admin
+        ).first()
+
+    def _model_for_user_query(
+        self, query: Any, model_id: int, user_id: int, is_admin: bool
+    ) -> Any:
+        query = query.filter(
+            models.Model.id == model_id, models.Model.is_deleted == False
         )
+        if not is_admin:
+            query = query.filter(models.Model.owner_id == user_id)
+        return query
 
     def get_models_by_owner(
-        self, owner_id: int, skip: int = 0, limit: int = 100
+        self,
+        owner_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        status: Optional[str] = None,
+        model_type: Optional[str] = None,
     ) -> List[models.Model]:
         return (
-            self.db.query(models.Model)
-            .filter(
-                and_(
-                    models.Model.owner_id == owner_id, models.Model.is_deleted == False
-                )
-            )
+            self._models_query(owner_id, status, model_type)
             .offset(skip)
             .limit(limit)
             .all()
         )
 
-    def get_all_models(self, skip: int = 0, limit: int = 100) -> List[models.Model]:
+    def get_all_models(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        status: Optional[str] = None,
+        model_type: Optional[str] = None,
+    ) -> List[models.Model]:
         return (
-            self.db.query(models.Model)
-            .filter(models.Model.is_deleted == False)
+            self._models_query(None, status, model_type).offset(skip).limit(limit).all()
+        )
+
+    def stream_models(
+        self,
+        owner_id: Optional[int] = None,
+        skip: int = 0,
+        limit: int = 100,
+        status: Optional[str] = None,
+        model_type: Optional[str] = None,
+        batch_size: int = 200,
+    ) -> Iterable[models.Model]:
+        """Like get_all_models/get_models_by_owner, but fetches rows in batches."""
+        return (
+            self._models_query(owner_id, status, model_type)
             .offset(skip)
             .limit(limit)
-            .all()
+            .yield_per(batch_size)
         )
 
+    def _models_query(
+        self,
+        owner_id: Optional[int],
+        status: Optional[str],
+        model_type: Optional[str],
+    ) -> Any:
+        """Build the model listing query with optional filters applied in SQL."""
+        query = self.db.query(models.Model).filter(models.Model.is_deleted == False)
+        if owner_id is not None:
+            query = query.filter(models.Model.owner_id == owner_id)
+        if status:
+            query = query.filter(models.Model.status == status)
+        if model_type:
+            query = query.filter(models.Model.model_type == model_type)
+        return query
+
     def update_model_record(self, model_id: int, **kwargs) -> Optional[models.Model]:
         model = self.get_model_by_id(model_id)
         if not model:
@@ -114,6 +255,7 @@ class ModelService:
                 setattr(model, key, value)
         self.db.commit()
         self.db.refresh(model)
+        _forget_model_name(model_id)
         return model
 
     def soft_delete_model(self, model_id: int, deleted_by_id: int) -> bool:
@@ -124,6 +266,7 @@ class ModelService:
         model.deleted_at = datetime.utcnow()
         model.deleted_by_id = deleted_by_id
         self.db.commit()
+        _forget_model_name(model_id)
         return True
 
     def save_trained_model(
@@ -137,7 +280,7 @@ class ModelService:
             file_path = os.path.join(
                 settings.model_storage_directory, f"model_{model_id}.pkl"
             )
-            joblib.dump(trained_model, file_path)
+            _dump_artifact(trained_model, file_path)
             model.file_path = file_path
             model.status = models.ModelStatus.TRAINED
             model.trained_at = datetime.utcnow()
@@ -163,12 +306,49 @@ class ModelService:
                 f"Model {model_id} not found, not trained, or file path missing."
             )
             return None
+        return self.load_model_file(model_id, model.file_path, model.trained_at)
+
+    @staticmethod
+    def load_model_file(
+        model_id: int, file_path: str, trained_at: Optional[datetime] = None
+    ) -> Optional[Any]:
+        """Deserialize a model artifact without touching the session (thread-safe).
+
+        Loaded artifacts are memoized per (model, file, trained_at), so a
+        retrain invalidates the cached copy.
+        """
         try:
-            return joblib.load(model.file_path)
+            return _load_artifact(model_id, file_path, trained_at)
         except Exception as e:
-            logger.error(f"Error loading model {model_id} from {model.file_path}: {e}")
+            logger.error(f"Error loading model {model_id} from {file_path}: {e}")
             return None
 
+    def preload_trained_models(self) -> int:
+        """Warm the artifact cache with the most recently trained models.
+
+        Called at startup so the first prediction against a model does not
+        pay for deserializing it. Returns how many artifacts were loaded.
+        """
+        rows = (
+            self.db.query(
+                models.Model.id, models.Model.file_path, models.Model.trained_at
+            )
+            .filter(
+                models.Model.status == models.ModelStatus.TRAINED,
+                models.Model.file_path.isnot(None),
+                models.Model.is_deleted == False,
+            )
+            .order_by(models.Model.trained_at.desc())
+            .limit(_ARTIFACT_CACHE_SIZE)
+            .all()
+        )
+        loaded = 0
+        for row in rows:
+            artifact = self.load_model_file(row.id, row.file_path, row.trained_at)
+            if artifact is not None:
+                loaded += 1
+        return loaded
+
     def train_model(self, model_id: int, data: pd.DataFrame) -> bool:
         model = self.get_model_by_id(model_id)
         if not model:
@@ -210,6 +390,11 @@ class ModelService:
             self.db.commit()
             return False
 
+    def train_dummy_model(self, model_id: int, n_samples: int = 200) -> bool:
+        """Train ``model_id`` on synthetic data; the last column is the target."""
+        data = pd.DataFrame(np.random.randn(n_samples, 11))
+        return self.train_model(model_id, data)
+
     def predict_with_model(
         self, model_id: int, input_data: pd.DataFrame
     ) -> Optional[pd.DataFrame]:
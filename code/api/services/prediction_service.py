@@ -2,17 +2,267 @@
 Prediction service for handling model predictions
 """
 
+import hashlib
+import os
+import queue
+import threading
 import time
-from typing import Any, Dict, List, Optional
+from collections import OrderedDict, defaultdict
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
 import numpy as np
-from sqlalchemy import desc
 from sqlalchemy.orm import Session
 from .. import models
+from ..database import count_ids, newest_first
 from .model_service import ModelService
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Caps concurrent model inference across request threads so native ML
+# thread pools are not oversubscribed; DB work is left outside the cap.
+MAX_CONCURRENT_INFERENCES = int(
+    os.getenv("MAX_CONCURRENT_INFERENCES", str(max(2, (os.cpu_count() or 2) // 2)))
+)
+_inference_slots = threading.BoundedSemaphore(MAX_CONCURRENT_INFERENCES)
+
+
+_Predictor = Callable[[np.ndarray], Tuple[Any, List[float]]]
+
+# Specialized inference callables per loaded artifact, keyed by id() with the
+# artifact kept alongside so a recycled id is never mistaken for a hit.
+_PREDICTOR_CACHE_SIZE = 64
+_predictors: Dict[int, Tuple[Any, _Predictor]] = {}
+
+
+def _build_predictor(trained_model: Any) -> _Predictor:
+    """Pick the inference path for ``trained_model`` once, not per call."""
+    predict = trained_model.predict
+    predict_proba = getattr(trained_model, "predict_proba", None)
+    classes = getattr(trained_model, "classes_", None)
+
+    if classes is not None and predict_proba is not None:
+        labels = np.asarray(classes)
+
+        # Classifiers predict the most probable class, so a single
+        # predict_proba pass yields both the label and its confidence.
+        def run(features: np.ndarray) -> Tuple[Any, List[float]]:
+            probabilities = np.asarray(predict_proba(features))
+            return (
+                labels[probabilities.argmax(axis=1)],
+                probabilities.max(axis=1).tolist(),
+            )
+
+    elif predict_proba is not None:
+
+        def run(features: np.ndarray) -> Tuple[Any, List[float]]:
+            predictions = predict(features)
+            try:
+                probabilities = predict_proba(features)
+                return predictions, [float(np.max(row)) for row in probabilities]
+            except:
+                return predictions, [0.8] * len(features)
+
+    else:
+
+        def run(features: np.ndarray) -> Tuple[Any, List[float]]:
+            return predict(features), [0.8] * len(features)
+
+    return run
+
+
+def _predictor_for(trained_model: Any) -> _Predictor:
+    entry = _predictors.get(id(trained_model))
+    if entry is not None and entry[0] is trained_model:
+        return entry[1]
+    predictor = _build_predictor(trained_model)
+    if len(_predictors) >= _PREDICTOR_CACHE_SIZE:
+        _predictors.clear()
+    _predictors[id(trained_model)] = (trained_model, predictor)
+    return predictor
+
+
+def _infer_rows(trained_model: Any, rows: List[List[float]]) -> List[Tuple[Any, float]]:
+    """Run one inference pass over ``rows``.
+
+    Returns a ``(prediction_result, confidence_score)`` pair per row, shaped
+    exactly as a single-row call would produce them.
+    """
+    predictor = _predictor_for(trained_model)
+    # One contiguous float32 block: no per-call dtype inference and half the
+    # memory traffic of float64 (tree models cast to float32 internally).
+    features = np.ascontiguousarray(rows, dtype=np.float32)
+    with _inference_slots:
+        predictions, confidences = predictor(features)
+    predictions = np.asarray(predictions)
+    return [
+        (predictions[i : i + 1].tolist(), confidence)
+        for i, confidence in enumerate(confidences)
+    ]
+
+
+class _InferenceBatcher:
+    """Coalesces concurrent single-row predictions into batched model calls.
+
+    Request threads enqueue their features and wait on a future. Each worker
+    takes the first pending item, gathers whatever else arrives within
+    ``max_latency`` seconds (up to ``max_batch`` items) and runs one
+    inference pass per model in that batch. Until ``start`` is called (e.g.
+    in scripts and Celery tasks) and again after ``stop``, ``submit`` runs
+    inference inline. Callers wait at most ``result_timeout`` seconds.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        max_batch: int = 32,
+        max_latency: float = 0.01,
+        result_timeout: float = 30.0,
+    ):
+        self.workers = workers
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.result_timeout = result_timeout
+        self._queue: "queue.Queue[Tuple[Any, List[float], Future]]" = queue.Queue()
+        # Guards _running so nothing is enqueued once stop() has begun
+        # draining; such callers fall back to inline inference instead.
+        self._lock = threading.Lock()
+        self._running = False
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def submit(self, trained_model: Any, input_data: List[float]) -> Tuple[Any, float]:
+        future: Future = Future()
+        with self._lock:
+            running = self._running
+            if running:
+                self._queue.put((trained_model, input_data, future))
+        if not running:
+            return _infer_rows(trained_model, [input_data])[0]
+        return future.result(timeout=self.result_timeout)
+
+    def start(self) -> None:
+        with self._lock:
+            if self._running:
+                return
+            self._stop.clear()
+            for i in range(self.workers):
+                thread = threading.Thread(
+                    target=self._run, name=f"inference-batcher-{i}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+            self._running = True
+
+    def stop(self) -> None:
+        with self._lock:
+            if not self._running:
+                return
+            self._running = False
+            threads, self._threads = self._threads, []
+        self._stop.set()
+        for thread in threads:
+            thread.join(timeout=1)
+        # Anything the workers did not pick up is answered inline.
+        pending = []
+        while True:
+            try:
+                pending.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if pending:
+            self._run_batch(pending)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                batch = [self._queue.get(timeout=0.1)]
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + self.max_latency
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._run_batch(batch)
+
+    @staticmethod
+    def _run_batch(batch: List[Tuple[Any, List[float], Future]]) -> None:
+        by_model: Dict[int, List[Tuple[Any, List[float], Future]]] = defaultdict(list)
+        for item in batch:
+            by_model[id(item[0])].append(item)
+        for items in by_model.values():
+            trained_model = items[0][0]
+            try:
+                results = _infer_rows(trained_model, [item[1] for item in items])
+            except Exception as e:
+                if len(items) == 1:
+                    items[0][2].set_exception(e)
+                    continue
+                # Retry row by row so one bad input only fails its own request.
+                for _, input_data, future in items:
+                    try:
+                        future.set_result(_infer_rows(trained_model, [input_data])[0])
+                    except Exception as row_error:
+                        future.set_exception(row_error)
+                continue
+            for (_, _, future), result in zip(items, results):
+                future.set_result(result)
+
+
+# Started and stopped by the application lifespan.
+inference_batcher = _InferenceBatcher(MAX_CONCURRENT_INFERENCES)
+
+_PREDICTION_CACHE_SIZE = 4096
+_PREDICTION_CACHE_TTL_SECONDS = 60
+
+
+class _PredictionCache:
+    """Thread-safe LRU of recent inference results with a per-entry TTL."""
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self._ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+
+_prediction_cache = _PredictionCache(
+    _PREDICTION_CACHE_SIZE, _PREDICTION_CACHE_TTL_SECONDS
+)
+
+
+def _prediction_cache_key(model: models.Model, input_data: List[float]) -> Hashable:
+    # trained_at is part of the key so a retrain never serves stale results.
+    digest = hashlib.blake2b(
+        np.asarray(input_data, dtype=np.float64).tobytes(), digest_size=16
+    ).digest()
+    return (model.id, model.trained_at, digest)
+
 
 class PredictionService:
 
@@ -24,7 +274,7 @@ class PredictionService:
         self, user_id: int, model_id: int, input_data: List[float]
     ) -> Optional[models.Prediction]:
         """Create a new prediction"""
-        user = self.db.query(models.User).filter(models.User.id == user_id).first()
+        user = self.db.get(models.User, user_id)
         if not user:
             raise ValueError("User not found")
         model = self.model_service.get_model_by_id(model_id)
@@ -34,18 +284,21 @@ class PredictionService:
             raise ValueError("Model is not trained yet")
         try:
             start_time = time.time()
-            trained_model = self.model_service.load_trained_model(model_id)
-            if not trained_model:
-                raise ValueError("Failed to load trained model")
-            prediction_result = trained_model.predict([input_data])
-            try:
-                probabilities = trained_model.predict_proba([input_data])
-                confidence_score = float(np.max(probabilities))
-            except:
-                confidence_score = 0.8
+            # Identical feature vectors resent within the TTL reuse the
+            # earlier result; the prediction is still recorded below.
+            cache_key = _prediction_cache_key(model, input_data)
+            cached = _prediction_cache.get(cache_key)
+            if cached is not None:
+                prediction_result, confidence_score = cached
+            else:
+                trained_model = self.model_service.load_trained_model(model_id)
+                if not trained_model:
+                    raise ValueError("Failed to load trained model")
+                prediction_result, confidence_score = inference_batcher.submit(
+                    trained_model, input_data
+                )
+                _prediction_cache.put(cache_key, (prediction_result, confidence_score))
             execution_time = int((time.time() - start_time) * 1000)
-            if isinstance(prediction_result, np.ndarray):
-                prediction_result = prediction_result.tolist()
             prediction = models.Prediction(
                 user_id=user_id,
                 model_id=model_id,
@@ -64,50 +317,98 @@ class PredictionService:
 
     def get_prediction_by_id(self, prediction_id: int) -> Optional[models.Prediction]:
         """Get prediction by ID"""
-        return (
-            self.db.query(models.Prediction)
-            .filter(models.Prediction.id == prediction_id)
-            .first()
-        )
+        return self.db.get(models.Prediction, prediction_id)
 
     def get_predictions_by_user(
-        self, user_id: int, skip: int = 0, limit: int = 100
+        self,
+        user_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        before_ts: Optional[datetime] = None,
+        before_id: Optional[int] = None,
     ) -> List[models.Prediction]:
-        """Get predictions by user"""
-        return (
-            self.db.query(models.Prediction)
-            .filter(models.Prediction.user_id == user_id)
-            .order_by(desc(Prediction.created_at))
-            .offset(skip)
-            .limit(limit)
-            .all()
-        )
+        """Get predictions by user, newest first, optionally before a keyset cursor"""
+        return self._predictions_page(
+            user_id, None, skip, limit, before_ts, before_id
+        ).all()
 
     def get_predictions_by_model(
-        self, model_id: int, skip: int = 0, limit: int = 100
+        self,
+        model_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        before_ts: Optional[datetime] = None,
+        before_id: Optional[int] = None,
     ) -> List[models.Prediction]:
-        """Get predictions by model"""
-        return (
-            self.db.query(models.Prediction)
-            .filter(models.Prediction.model_id == model_id)
-            .order_by(desc(Prediction.created_at))
-            .offset(skip)
-            .limit(limit)
-            .all()
-        )
+        """Get predictions by model, newest first, optionally before a keyset cursor"""
+        return self._predictions_page(
+            None, model_id, skip, limit, before_ts, before_id
+        ).all()
 
     def get_all_predictions(
-        self, skip: int = 0, limit: int = 100
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        before_ts: Optional[datetime] = None,
+        before_id: Optional[int] = None,
     ) -> List[models.Prediction]:
-        """Get all predictions (admin only)"""
+        """Get all predictions (admin only), optionally before a keyset cursor"""
+        return self._predictions_page(
+            None, None, skip, limit, before_ts, before_id
+        ).all()
+
+    def stream_predictions(
+        self,
+        user_id: Optional[int] = None,
+        model_id: Optional[int] = None,
+        skip: int = 0,
+        limit: int = 100,
+        before_ts: Optional[datetime] = None,
+        before_id: Optional[int] = None,
+        batch_size: int = 200,
+    ) -> Iterable[models.Prediction]:
+        """Like the get_predictions_* methods, but fetches rows in batches"""
+        return self._predictions_page(
+            user_id, model_id, skip, limit, before_ts, before_id
+        ).yield_per(batch_size)
+
+    def _predictions_page(
+        self,
+        user_id: Optional[int],
+        model_id: Optional[int],
+        skip: int,
+        limit: int,
+        before_ts: Optional[datetime],
+        before_id: Optional[int],
+    ) -> Any:
+        query = self.db.query(models.Prediction)
+        if user_id:
+            query = query.filter(models.Prediction.user_id == user_id)
+        if model_id:
+            query = query.filter(models.Prediction.model_id == model_id)
         return (
-            self.db.query(models.Prediction)
-            .order_by(desc(models.Prediction.created_at))
+            newest_first(
+                query,
+                models.Prediction.created_at,
+                models.Prediction.id,
+                before_ts,
+                before_id,
+            )
             .offset(skip)
             .limit(limit)
-            .all()
         )
 
+    def count_predictions(
+        self, user_id: Optional[int] = None, model_id: Optional[int] = None
+    ) -> int:
+        """Count predictions for a user and/or model"""
+        query = self.db.query(models.Prediction)
+        if user_id:
+            query = query.filter(models.Prediction.user_id == user_id)
+        if model_id:
+            query = query.filter(models.Prediction.model_id == model_id)
+        return count_ids(query, models.Prediction.id)
+
     def get_prediction_statistics(
         self, user_id: int = None, model_id: int = None
     ) -> Dict[str, Any]:
@@ -2,12 +2,55 @@
 User service for user management operations
 """
 
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from .. import models
 from sqlalchemy import and_
 from sqlalchemy.orm import Session
 
+# Successful API key validations, keyed by key hash. A hit skips the key and
+# user lookups; revoke_api_key evicts immediately, other changes (user
+# deactivation, role edits) take effect within the TTL.
+_API_KEY_CACHE_TTL_SECONDS = 30
+_API_KEY_CACHE_SIZE = 10_000
+_api_key_cache: Dict[str, Tuple[float, dict, Optional[datetime]]] = {}
+_api_key_cache_lock = threading.Lock()
+
+
+def _cached_api_key(key_hash: str) -> Optional[dict]:
+    with _api_key_cache_lock:
+        entry = _api_key_cache.get(key_hash)
+    if entry is None:
+        return None
+    expires, user_info, key_expires_at = entry
+    if expires <= time.monotonic() or (
+        key_expires_at and key_expires_at < datetime.utcnow()
+    ):
+        _forget_api_key(key_hash)
+        return None
+    return dict(user_info)
+
+
+def _remember_api_key(
+    key_hash: str, user_info: dict, key_expires_at: Optional[datetime]
+) -> None:
+    with _api_key_cache_lock:
+        if len(_api_key_cache) >= _API_KEY_CACHE_SIZE:
+            # Dicts keep insertion order, so this drops the oldest entry.
+            _api_key_cache.pop(next(iter(_api_key_cache)))
+        _api_key_cache[key_hash] = (
+            time.monotonic() + _API_KEY_CACHE_TTL_SECONDS,
+            user_info,
+            key_expires_at,
+        )
+
+
+def _forget_api_key(key_hash: str) -> None:
+    with _api_key_cache_lock:
+        _api_key_cache.pop(key_hash, None)
+
 
 class UserService:
 
@@ -58,17 +101,25 @@ class UserService:
         return None
 
     def get_user_by_id(self, user_id: int) -> Optional[models.User]:
-        """Get user by ID"""
-        return (
-            self.db.query(models.User)
-            .filter(
-                and_(
-                    models.models.User.id == user_id,
-                    models.models.User.is_active == True,
-                )
-            )
-            .first()
+        """Get user by ID.
+
+        ``Session.get`` serves rows already in the identity map without a
+        query; inactive users are filtered out afterwards.
+        """
+        user = self.db.get(models.User, user_id)
+        return user if user is not None and user.is_active else None
+
+    def get_usernames_by_ids(self, user_ids: Iterable[int]) -> Dict[int, str]:
+        """Map active user IDs to usernames with a single IN query"""
+        ids = set(user_ids)
+        if not ids:
+            return {}
+        rows = (
+            self.db.query(models.User.id, models.User.username)
+            .filter(models.User.id.in_(ids), models.User.is_active == True)
+            .all()
         )
+        return {row.id: row.username for row in rows}
 
     def get_user_by_username(self, username: str) -> Optional[models.User]:
         """Get user by username"""
@@ -101,7 +152,7 @@ class UserService:
         for key, value in kwargs.items():
             if hasattr(user, key) and key != "id":
                 if key == "password":
-                    user.hashed_password = models.models.User.hash_password(value)
+                    user.hashed_password = models.User.hash_password(value)
                 else:
                     setattr(user, key, value)
         user.updated_at = datetime.utcnow()
@@ -139,8 +190,15 @@ class UserService:
         return key
 
     def validate_api_key(self, key: str) -> Optional[dict]:
-        """Validate API key and return user info"""
+        """Validate API key and return user info.
+
+        Successful lookups are cached briefly, so ``last_used`` is refreshed
+        at most once per cache TTL.
+        """
         key_hash = models.ApiKey.hash_key(key)
+        cached = _cached_api_key(key_hash)
+        if cached is not None:
+            return cached
         api_key = (
             self.db.query(models.ApiKey)
             .filter(
@@ -159,35 +217,46 @@ class UserService:
             return None
         api_key.last_used = datetime.utcnow()
         self.db.commit()
-        return {
+        user_info = {
             "user_id": user.id,
             "username": user.username,
             "email": user.email,
-            "role": user.role,
+            "role": user.role.role_name if user.role else None,
             "api_key_id": api_key.id,
             "expires_at": (
                 api_key.expires_at.isoformat() if api_key.expires_at else None
             ),
         }
+        _remember_api_key(key_hash, user_info, api_key.expires_at)
+        return dict(user_info)
 
     def revoke_api_key(self, key: str) -> bool:
-        """Revoke API key"""
+        """Revoke API key with a single conditional UPDATE"""
         key_hash = models.ApiKey.hash_key(key)
-        api_key = (
+        updated = (
             self.db.query(models.ApiKey)
             .filter(models.ApiKey.key_hash == key_hash)
-            .first()
+            .update({"is_active": False}, synchronize_session=False)
         )
-        if not api_key:
-            return False
-        api_key.is_active = False
         self.db.commit()
-        return True
+        _forget_api_key(key_hash)
+        return updated > 0
 
-    def get_user_api_keys(self, user_id: int) -> List[models.ApiKey]:
-        """Get all API keys for a user"""
+    def get_user_api_keys(self, user_id: int) -> List[Any]:
+        """Get all API keys for a user.
+
+        Returns lightweight rows with only the listing columns (never the key
+        hash), so no ApiKey entities are built or tracked by the session.
+        """
         return (
-            self.db.query(models.ApiKey)
+            self.db.query(
+                models.ApiKey.id,
+                models.ApiKey.name,
+                models.ApiKey.created_at,
+                models.ApiKey.expires_at,
+                models.ApiKey.last_used,
+                models.ApiKey.is_active,
+            )
             .filter(
                 and_(models.ApiKey.user_id == user_id, models.ApiKey.is_active == True)
             )
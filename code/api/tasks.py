@@ -25,6 +25,7 @@ from .models import (
     Prediction,
     User,
 )
+from .services.model_service import ModelService
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -61,10 +62,10 @@ class DatabaseTask(Task):
     """Base task class with database session management"""
 
     def __call__(self, *args, **kwargs) -> Any:
-        """Execute task with database session"""
+        """Execute task with database session passed as the first argument"""
         db = SessionLocal()
         try:
-            return self.run_with_db(db, *args, **kwargs)
+            return self.run(db, *args, **kwargs)
         except Exception as e:
             db.rollback()
             logger.error(f"Task {self.name} failed: {e}")
@@ -72,9 +73,13 @@ class DatabaseTask(Task):
         finally:
             db.close()
 
-    def run_with_db(self, db: Session, *args, **kwargs) -> Any:
-        """Override this method in subclasses"""
-        raise NotImplementedError
+
+@celery_app.task(
+    bind=True, base=DatabaseTask, name="quantis.tasks.ml.train_dummy_model"
+)
+def train_dummy_model_task(self, db: Session, model_id: int) -> bool:
+    """Run ModelService training for the /models/{id}/train endpoint"""
+    return ModelService(db).train_dummy_model(model_id)
 
 
 @celery_app.task(bind=True, base=DatabaseTask, name="quantis.tasks.ml.train_model")
@@ -0,0 +1,26 @@
+from typing import Any
+from unittest.mock import MagicMock, patch
+from api.endpoints import auth
+
+
+def test_log_event_queues_while_buffer_running() -> Any:
+    db = MagicMock()
+    buffer = MagicMock(running=True)
+    with patch.object(auth, "audit_log_buffer", buffer):
+        auth.AuditLogger.log_event(db, 1, "user_login", "authentication")
+    buffer.add.assert_called_once()
+    row = buffer.add.call_args.args[0]
+    assert (row["user_id"], row["action"]) == (1, "user_login")
+    db.add.assert_not_called()
+    db.commit.assert_not_called()
+
+
+def test_log_event_commits_when_buffer_stopped() -> Any:
+    db = MagicMock()
+    buffer = MagicMock(running=False)
+    with patch.object(auth, "audit_log_buffer", buffer):
+        auth.AuditLogger.log_event(db, 1, "user_login", "authentication")
+    buffer.add.assert_not_called()
+    db.add.assert_called_once()
+    assert isinstance(db.add.call_args.args[0], auth.AuditLog)
+    db.commit.assert_called_once()
@@ -1,7 +1,7 @@
 from unittest.mock import MagicMock, patch
 import pytest
 from api.app import app
-from api.middleware.auth import validate_api_key
+from api.middleware.auth import Roles, validate_api_key
 from fastapi import HTTPException
 from fastapi.testclient import TestClient
 
@@ -93,17 +93,20 @@ def test_model_health_detailed(test_client: Any) -> Any:
     assert response.status_code == 405
 
 
-@pytest.mark.asyncio
-async def test_api_key_validation_with_env_vars(monkeypatch):
+def test_api_key_validation_with_env_vars(monkeypatch):
+    # A session that holds no API keys, so only API_SECRET can match.
+    db = MagicMock()
+    db.query.return_value.filter.return_value.first.return_value = None
     monkeypatch.setenv("API_SECRET", "correct_key")
-    result = await validate_api_key("correct_key")
-    assert result == "correct_key"
+    result = validate_api_key("correct_key", db)
+    assert result == {"user_id": "system", "username": "system", "role": Roles.ADMIN}
+    db.query.assert_not_called()
     with pytest.raises(HTTPException) as excinfo:
-        await validate_api_key("wrong_key")
+        validate_api_key("wrong_key", db)
     assert excinfo.value.status_code == 403
     monkeypatch.delenv("API_SECRET")
     with pytest.raises(HTTPException) as excinfo:
-        await validate_api_key("any_key")
+        validate_api_key("any_key", db)
     assert excinfo.value.status_code == 403
 
 
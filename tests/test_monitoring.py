@@ -0,0 +1,121 @@
+from types import SimpleNamespace
+from typing import Any
+from unittest.mock import MagicMock, patch
+import pytest
+from api.auth import get_current_user
+from api.database import get_db
+from api.endpoints import monitoring
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+
+def _user(role_name: str) -> Any:
+    return SimpleNamespace(id=1, role=SimpleNamespace(role_name=role_name))
+
+
+def _stats(total_users: int) -> Any:
+    return monitoring.SystemStats(
+        total_users=total_users,
+        active_users=0,
+        total_datasets=0,
+        total_models=0,
+        trained_models=0,
+        total_predictions=0,
+        predictions_last_24h=0,
+    )
+
+
+@pytest.fixture
+def monitoring_app() -> Any:
+    app = FastAPI()
+    app.include_router(monitoring.router, prefix="/monitoring")
+    app.dependency_overrides[get_db] = lambda: MagicMock()
+    monitoring._aggregate_cache.clear()
+    yield app
+    monitoring._aggregate_cache.clear()
+
+
+@pytest.mark.parametrize("role_name,expected", [("admin", 2), ("user", 1)])
+def test_stats_fresh_recounts_only_for_admins(
+    monitoring_app: Any, role_name: str, expected: int
+) -> Any:
+    monitoring_app.dependency_overrides[get_current_user] = lambda: _user(role_name)
+    client = TestClient(monitoring_app)
+    with patch.object(
+        monitoring,
+        "_compute_system_statistics",
+        side_effect=[_stats(1), _stats(2)],
+    ):
+        assert client.get("/monitoring/stats").json()["total_users"] == 1
+        response = client.get("/monitoring/stats", params={"fresh": "true"})
+    assert response.status_code == 200
+    assert response.json()["total_users"] == expected
+
+
+@pytest.fixture
+def audit_client(monitoring_app: Any) -> Any:
+    db = MagicMock()
+    db.execute.return_value.scalar_one.return_value = 5
+    monitoring_app.dependency_overrides[get_db] = lambda: db
+    monitoring_app.dependency_overrides[get_current_user] = lambda: _user("user")
+    return TestClient(monitoring_app), db
+
+
+def test_create_audit_log_queues_when_buffer_running(audit_client: Any) -> Any:
+    client, db = audit_client
+    buffer = MagicMock(running=True)
+    with patch.object(monitoring, "audit_log_buffer", buffer):
+        response = client.post(
+            "/monitoring/audit-logs",
+            params={"action": "login", "resource_type": "user"},
+        )
+    assert response.status_code == 202
+    buffer.add.assert_called_once()
+    assert buffer.add.call_args.args[0]["user_id"] == 1
+    db.commit.assert_not_called()
+
+
+@pytest.mark.parametrize("running,sync", [(False, False), (True, True)])
+def test_create_audit_log_inserts_immediately(
+    audit_client: Any, running: bool, sync: bool
+) -> Any:
+    client, db = audit_client
+    buffer = MagicMock(running=running)
+    with patch.object(monitoring, "audit_log_buffer", buffer):
+        response = client.post(
+            "/monitoring/audit-logs",
+            params={"action": "login", "resource_type": "user", "sync": sync},
+        )
+    assert response.status_code == 200
+    assert response.json()["id"] == 5
+    buffer.add.assert_not_called()
+    db.commit.assert_called_once()
+
+
+def test_health_sampler_does_not_cache_fallback_sample() -> Any:
+    sampler = monitoring._HealthSampler()
+    with patch.object(
+        monitoring.psutil, "cpu_percent", side_effect=[10.0, 20.0]
+    ), patch.object(monitoring.psutil, "virtual_memory"), patch.object(
+        monitoring.psutil, "disk_usage"
+    ):
+        first = sampler.snapshot()
+        second = sampler.snapshot()
+    assert (first.cpu_percent, second.cpu_percent) == (10.0, 20.0)
+
+
+def test_record_metric_not_implemented(monitoring_app: Any) -> Any:
+    monitoring_app.dependency_overrides[monitoring.require_admin] = lambda: _user(
+        "admin"
+    )
+    client = TestClient(monitoring_app)
+    response = client.post(
+        "/monitoring/metrics", params={"metric_name": "cpu", "metric_value": 1.0}
+    )
+    assert response.status_code == 501
+
+
+def test_get_system_metrics_not_implemented(monitoring_app: Any) -> Any:
+    monitoring_app.dependency_overrides[get_current_user] = lambda: _user("user")
+    response = TestClient(monitoring_app).get("/monitoring/metrics")
+    assert response.status_code == 501
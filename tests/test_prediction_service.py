@@ -0,0 +1,72 @@
+import threading
+from concurrent.futures import Future, TimeoutError
+from typing import Any
+import numpy as np
+import pytest
+from api.services.prediction_service import _InferenceBatcher
+
+
+class RecordingModel:
+
+    def __init__(self) -> None:
+        self.batch_sizes = []
+
+    def predict(self, features: Any) -> Any:
+        self.batch_sizes.append(len(features))
+        if np.isnan(features).any():
+            raise ValueError("NaN in features")
+        return features.sum(axis=1)
+
+
+def test_batcher_coalesces_concurrent_submits() -> Any:
+    model = RecordingModel()
+    batcher = _InferenceBatcher(workers=1, max_latency=0.2)
+    batcher.start()
+    results = {}
+    barrier = threading.Barrier(4)
+
+    def call(i: int) -> None:
+        barrier.wait()
+        results[i] = batcher.submit(model, [float(i), 1.0])
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(4)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+    finally:
+        batcher.stop()
+    assert results == {i: ([float(i) + 1.0], 0.8) for i in range(4)}
+    assert max(model.batch_sizes) > 1
+
+
+def test_batch_failure_retries_rows_individually() -> Any:
+    model = RecordingModel()
+    good, bad = Future(), Future()
+    _InferenceBatcher._run_batch(
+        [(model, [1.0, 2.0], good), (model, [float("nan"), 2.0], bad)]
+    )
+    assert good.result(timeout=0) == ([3.0], 0.8)
+    with pytest.raises(ValueError):
+        bad.result(timeout=0)
+    assert model.batch_sizes == [2, 1, 1]
+
+
+def test_submit_runs_inline_after_stop() -> Any:
+    model = RecordingModel()
+    batcher = _InferenceBatcher(workers=1)
+    batcher.start()
+    batcher.stop()
+    assert batcher.submit(model, [1.0, 2.0]) == ([3.0], 0.8)
+
+
+def test_submit_times_out_and_stop_drains_queue() -> Any:
+    model = RecordingModel()
+    # No workers: queued items are only answered by stop().
+    batcher = _InferenceBatcher(workers=0, result_timeout=0.05)
+    batcher.start()
+    with pytest.raises(TimeoutError):
+        batcher.submit(model, [1.0, 2.0])
+    batcher.stop()
+    assert model.batch_sizes == [1]
@@ -0,0 +1,36 @@
+from typing import Any
+from unittest.mock import MagicMock, patch
+import pytest
+from api import tasks
+
+
+@pytest.fixture
+def eager_celery() -> Any:
+    tasks.celery_app.conf.task_always_eager = True
+    yield
+    tasks.celery_app.conf.task_always_eager = False
+
+
+def test_train_dummy_model_task_runs_with_session(eager_celery: Any) -> Any:
+    db = MagicMock()
+    with patch.object(tasks, "SessionLocal", return_value=db), patch.object(
+        tasks.ModelService, "train_dummy_model", return_value=True
+    ) as train:
+        result = tasks.train_dummy_model_task.delay(7)
+    assert result.get() is True
+    train.assert_called_once_with(7)
+    db.commit.assert_not_called()
+    db.rollback.assert_not_called()
+    db.close.assert_called_once()
+
+
+def test_train_dummy_model_task_rolls_back_on_error(eager_celery: Any) -> Any:
+    db = MagicMock()
+    with patch.object(tasks, "SessionLocal", return_value=db), patch.object(
+        tasks.ModelService, "train_dummy_model", side_effect=RuntimeError("boom")
+    ):
+        result = tasks.train_dummy_model_task.delay(7)
+        with pytest.raises(RuntimeError):
+            result.get()
+    db.rollback.assert_called_once()
+    db.close.assert_called_once()
@@ -0,0 +1,97 @@
+from typing import Any
+import pytest
+from api.auth import get_current_user
+from api.database import get_db
+from api.endpoints import users
+from api.models import Base, Permission, Role, User
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+
+@pytest.fixture
+def db() -> Any:
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def seeded(db: Any) -> Any:
+    names = ["update_user", "update_all_users", "update_role", "read_users"]
+    perms = {name: Permission(permission_name=name) for name in names}
+    admin_role = Role(role_name="admin", permissions=list(perms.values()))
+    user_role = Role(role_name="user", permissions=[perms["update_user"]])
+    admin = User(
+        username="admin",
+        email="admin@example.com",
+        hashed_password="x",
+        role=admin_role,
+    )
+    alice = User(
+        username="alice", email="alice@example.com", hashed_password="x", role=user_role
+    )
+    bob = User(
+        username="bob", email="bob@example.com", hashed_password="x", role=user_role
+    )
+    db.add_all([admin, alice, bob])
+    db.commit()
+    return {"admin": admin, "alice": alice, "bob": bob, "perms": perms}
+
+
+def _client(db: Any, current_user: User) -> TestClient:
+    app = FastAPI()
+    app.include_router(users.router, prefix="/users")
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_current_user] = lambda: current_user
+    return TestClient(app)
+
+
+def test_update_self(db: Any, seeded: Any) -> Any:
+    alice = seeded["alice"]
+    client = _client(db, alice)
+    response = client.put(f"/users/{alice.id}", json={"first_name": "Alice"})
+    assert response.status_code == 200
+    assert response.json()["first_name"] == "Alice"
+    assert response.json()["role"] == "user"
+    db.expire_all()
+    assert db.get(User, alice.id).first_name == "Alice"
+
+
+def test_update_other_without_permission(db: Any, seeded: Any) -> Any:
+    client = _client(db, seeded["alice"])
+    bob_id = seeded["bob"].id
+    response = client.put(f"/users/{bob_id}", json={"first_name": "Mallory"})
+    assert response.status_code == 403
+    db.expire_all()
+    assert db.get(User, bob_id).first_name is None
+
+
+@pytest.mark.parametrize("username", ["alice", "admin"])
+def test_update_missing_user(db: Any, seeded: Any, username: str) -> Any:
+    client = _client(db, seeded[username])
+    response = client.put("/users/9999", json={"first_name": "Nobody"})
+    assert response.status_code == 404
+
+
+def test_update_role_relinks_permissions(db: Any, seeded: Any) -> Any:
+    client = _client(db, seeded["admin"])
+    role_id = seeded["alice"].role_id
+    read_users = seeded["perms"]["read_users"]
+    response = client.put(
+        f"/users/roles/{role_id}",
+        json={"role_name": "analyst", "permission_ids": [read_users.id]},
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["role_name"] == "analyst"
+    assert [p["permission_name"] for p in body["permissions"]] == ["read_users"]